@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    A thread safe least recently used cache where entries can expire after a
+    time to live and can be given a weight, e.g. the number of rows they hold,
+    so memory is bounded by the total weight as well as the number of entries.
+
+    Entries belong to a version, such as the version of the loaded data, and
+    the whole cache is emptied the first time it's used with a new version.
+    A cache with max_entries of 0 is disabled and never stores anything.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_weight: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.ttl = ttl
+        self.version = None
+        self.weight = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Any = None, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, weight, expires = entry
+            if expires is not None and expires < time.monotonic():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, version: Any = None, weight: int = 1):
+        if not self.enabled:
+            return
+        if self.max_weight is not None and weight > self.max_weight:
+            # never worth evicting everything else for
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, weight, expires)
+            self.weight += weight
+            while len(self._entries) > self.max_entries or (
+                self.max_weight is not None and self.weight > self.max_weight
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def _check_version(self, version: Any):
+        if version != self.version:
+            self._entries.clear()
+            self.weight = 0
+            self.version = version
+
+    def _remove(self, key: Hashable):
+        _, weight, _ = self._entries.pop(key)
+        self.weight -= weight
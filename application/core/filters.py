@@ -1,4 +1,4 @@
-from application.core.utils import NoneToEmptyStringEncoder
+from application.core.utils import NoneToEmptyStringEncoder, RawJSON
 from jinja2 import pass_eval_context
 from markdown import markdown
 from markupsafe import Markup
@@ -256,6 +256,8 @@ def get_entity_geometry(entity):
     data = None
     if entity and entity.geojson is not None:
         data = entity.geojson.geometry
+        if isinstance(data, RawJSON):
+            data = json.loads(data)
 
     if data is None:
         logger.warning(
@@ -0,0 +1,74 @@
+import hashlib
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.requests import Request
+
+# routes whose responses only change when the data does, so can be validated
+# with the data version. Facts are served from datasette so aren't among them
+DATA_ROUTES = ("/entity", "/dataset", "/curie", "/prefix", "/organisation")
+
+
+def get_cache_control(path: str, max_age: int) -> Optional[str]:
+    """
+    The Cache-Control header for a route. Data can be reused for as long as
+    it takes the server to notice new data, and revalidated after that.
+    Other pages only change when the service is released.
+    """
+    if _matches(path, DATA_ROUTES):
+        return f"public, max-age={max_age}, must-revalidate"
+    if _matches(path, ("/os",)):
+        # OS map tokens are short lived and must not be shared
+        return "no-store"
+    if _matches(path, ("/map", "/guidance", "/about")):
+        return "public, max-age=600"
+    return None
+
+
+def is_data_route(path: str) -> bool:
+    return _matches(path, DATA_ROUTES)
+
+
+def make_etag(request: Request, version: str, release: Optional[str] = None) -> str:
+    """
+    A weak ETag for the response to a request, which is the same for any
+    request of the same path and parameters, in any order, while the data
+    version and release don't change
+    """
+    query = urlencode(sorted(parse_qsl(request.url.query, keep_blank_values=True)))
+    key = f"{release}:{version}:{request.url.path}?{query}"
+    return f'W/"{hashlib.md5(key.encode("utf-8")).hexdigest()}"'
+
+
+def http_date(day: date) -> str:
+    return format_datetime(datetime.combine(day, time(), timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Whether the client's copy is current, by weak comparison of If-None-Match
+    with the ETag. If-Modified-Since is ignored, as the last updated date is
+    only precise to the day and data can be reloaded more than once a day.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, so W/ prefixes are ignored
+    tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+    return _opaque_tag(etag) in tags
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _matches(path: str, prefixes) -> bool:
+    return any(
+        path == prefix or path.startswith((f"{prefix}/", f"{prefix}."))
+        for prefix in prefixes
+    )
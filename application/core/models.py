@@ -1,12 +1,15 @@
 from datetime import date
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple, Union
 
 from geoalchemy2.shape import to_shape
 from geoalchemy2.elements import WKBElement, WKTElement
 from pydantic import BaseModel, Field, validator, Extra, create_model
+from pydantic.utils import GetterDict
+from sqlalchemy import inspect
 
 from application.db.models import EntityOrm
-from application.core.utils import to_snake
+from application.core.utils import RawJSON, to_snake
 
 
 def to_kebab(string: str) -> str:
@@ -14,7 +17,7 @@ def to_kebab(string: str) -> str:
 
 
 class GeoJSON(BaseModel):
-    geometry: dict
+    geometry: Union[RawJSON, dict]
     type: str = "Feature"
     properties: dict = None
 
@@ -52,7 +55,43 @@ def _make_geometry(v, values) -> str:
         return v
 
 
-class EntityModel(DigitalLandDateFieldsModel, extra=Extra.allow):
+class EntityGetterDict(GetterDict):
+    """
+    Reads an entity without loading attributes a search deferred. The
+    geometry and point are read from the simplified WKT the search loaded
+    in their place, if any, and fields in the json from the json.
+    """
+
+    def __init__(self, obj: Any):
+        super().__init__(obj)
+        if isinstance(obj, EntityOrm):
+            self._unloaded = inspect(obj).unloaded
+        else:
+            self._unloaded = set()
+        # the json may not have been loaded or selected
+        self.json = None
+        if "json" not in self._unloaded:
+            self.json = getattr(obj, "json", None)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if self.json and key in self.json:
+            return self.json[key]
+        if key in self._unloaded:
+            if key in ("geometry", "point"):
+                return getattr(self._obj, f"_{key}_wkt")
+            return default
+        if key == "geojson" and not isinstance(self._obj, EntityOrm):
+            # rows of selected fields have the GeoJSON geometry as text
+            geometry = super().get(key, default)
+            if isinstance(geometry, str):
+                return {"geometry": RawJSON(geometry), "type": "Feature"}
+            return geometry
+        return super().get(key, default)
+
+
+class EntityModel(
+    DigitalLandDateFieldsModel, extra=Extra.allow, getter_dict=EntityGetterDict
+):
     entity: int = None
     name: str = None
     dataset: str = None
@@ -136,28 +175,36 @@ class DatasetCollectionModel(DigitalLandBaseModel):
     last_collection_attempt: Optional[date] = None
 
 
+class DataVersionModel(DigitalLandBaseModel):
+    version: Optional[str] = None
+    last_updated: Optional[date] = None
+
+
 class DatasetPublicationCountModel(DigitalLandBaseModel):
     dataset_publication: str
     expected_publisher_count: int
     publisher_count: int
 
 
+@lru_cache(maxsize=1024)
+def _extended_entity_model(json_keys: Tuple[str, ...]):
+    # if values in json present then extend the pydantic model
+    # TODO could add in additional validation using field informtion
+    field_definitions = {to_snake(key): (Any, None) for key in json_keys}
+    return create_model(
+        "ExtendedEntityModel", **field_definitions, __base__=EntityModel
+    )
+
+
 def entity_factory(entity_orm: EntityOrm):
-    e = EntityModel.from_orm(entity_orm)
-    if entity_orm.json is not None:
-        # if values in json present then extend the pydantic model
-        # TODO could add in additional validation using field informtion
-        field_definitions = {
-            to_snake(key): (Any, None) for key in entity_orm.json.keys()
-        }
-        ExtendedEntityModel = create_model(
-            "ExtendedEntityModel", **field_definitions, __base__=EntityModel
-        )
-
-        # use new model with the added json fields
-        e = ExtendedEntityModel(**e.dict(by_alias=False), **entity_orm.json)
-
-    return e
+    entity = EntityGetterDict(entity_orm)
+    if not entity.json:
+        return EntityModel.from_orm(entity)
+
+    # models are shared by entities with the same json keys, which are
+    # read along with the other fields so each entity is validated once
+    ExtendedEntityModel = _extended_entity_model(tuple(sorted(entity.json.keys())))
+    return ExtendedEntityModel.from_orm(entity)
 
 
 class FactModel(DigitalLandBaseModel):
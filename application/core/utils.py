@@ -1,16 +1,21 @@
 import copy
 import json
+import re
 import typing
 import urllib
+import uuid
 from typing import List
 import logging
 
+import orjson
 import requests
 from pydantic import BaseModel
 from datetime import date
 
 from starlette.responses import Response
 
+from application.search.enum import CountOption
+
 
 def create_dict(keys_list, values_list):
     zip_iterator = zip(keys_list, values_list)
@@ -78,34 +83,145 @@ class NoneToEmptyStringEncoder(json.JSONEncoder):
         return super().encode(data)
 
 
-class DigitalLandJSONResponse(Response):
-    media_type = "application/json"
+class RawJSON(str):
+    """
+    JSON text, such as the GeoJSON postgres stores for an entity, that
+    is written into responses as it is rather than being parsed and
+    serialised again
+    """
 
-    def render(self, content: typing.Any) -> bytes:
-        return json.dumps(
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v):
+        if not isinstance(v, cls):
+            raise TypeError("RawJSON required")
+        return v
+
+
+# floats outside this range are written in exponent form, which orjson
+# formats differently to the json module, e.g. 1e+16 rather than 1e16
+_PLAIN_FLOAT_RANGE = (1e-4, 1e16)
+_INT_RANGE = (-(2**63), 2**64)
+
+
+class _EncodeState:
+    def __init__(self, marker):
+        self.marker = marker
+        self.raw_values = []
+        # whether orjson would write the same bytes as the json module
+        self.orjson_safe = True
+
+
+def _prepare_json(obj, state):
+    """
+    Walks the content once, writing None as an empty string, swapping RawJSON
+    values for a placeholder and noting anything orjson would write differently
+    """
+    if obj is None:
+        return ""
+    obj_type = type(obj)
+    if obj_type is str or obj_type is bool:
+        return obj
+    if obj_type is dict:
+        prepared = {}
+        for key, val in obj.items():
+            if type(key) is not str:
+                state.orjson_safe = False
+            prepared[key] = _prepare_json(val, state)
+        return prepared
+    if obj_type is list:
+        return [_prepare_json(val, state) for val in obj]
+    if obj_type is RawJSON:
+        state.raw_values.append(obj)
+        return f"{state.marker}{len(state.raw_values) - 1}"
+    if obj_type is int:
+        if not _INT_RANGE[0] <= obj < _INT_RANGE[1]:
+            state.orjson_safe = False
+        return obj
+    if obj_type is float:
+        if obj != 0 and not _PLAIN_FLOAT_RANGE[0] <= abs(obj) < _PLAIN_FLOAT_RANGE[1]:
+            # also catches nan and inf
+            state.orjson_safe = False
+        return obj
+    state.orjson_safe = False
+    if isinstance(obj, dict):
+        return {key: _prepare_json(val, state) for key, val in obj.items()}
+    if isinstance(obj, list):
+        return [_prepare_json(val, state) for val in obj]
+    # anything else, such as a tuple, is left to the json module
+    return obj
+
+
+def encode_json(content: typing.Any) -> bytes:
+    """
+    Encodes jsonable content the way API responses are, with None written as
+    an empty string and RawJSON values written as they are. orjson is used
+    when it gives the same bytes as the json module.
+    """
+    # RawJSON values are swapped for a placeholder string which is then
+    # replaced by the raw text in the encoded document
+    state = _EncodeState(uuid.uuid4().hex)
+    content = _prepare_json(content, state)
+    body = None
+    if state.orjson_safe:
+        try:
+            body = orjson.dumps(content).decode("utf-8")
+        except orjson.JSONEncodeError:
+            # such as content nested deeper than orjson's recursion limit
+            pass
+    if body is None:
+        body = json.dumps(
             content,
             ensure_ascii=False,
             allow_nan=False,
             indent=None,
             separators=(",", ":"),
-            cls=NoneToEmptyStringEncoder,
-        ).encode("utf-8")
+        )
+    if state.raw_values:
+        body = re.sub(
+            f'"{state.marker}(\\d+)"',
+            lambda match: state.raw_values[int(match.group(1))],
+            body,
+        )
+    return body.encode("utf-8")
+
+
+class DigitalLandJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: typing.Any) -> bytes:
+        return encode_json(content)
 
 
-def make_links(scheme, netloc, path, query, data):
+def make_links(scheme, netloc, path, query, data, cursor=False):
     """
     Creates a set of links for use on the entity search page
-    including extracting additional information of the data itself
+    including extracting additional information of the data itself.
+    Searches given after are linked by cursor, and those given an offset by
+    offset. Other searches are linked by cursor when cursor is set, as for
+    API clients walking whole datasets, otherwise by offset so the first
+    page has a last link and later ones a previous link.
     Arguments:
         scheme: str
         netloc: str
         path: str
         query: query string of incoming request
         data: dict that contains all the required data for a search query see get_entity_search
+        cursor: bool whether to link searches without after or an offset by cursor
     """
 
     from urllib.parse import urlunsplit
 
+    params = data["params"]
+    if params.get("after") is not None or (cursor and params.get("offset") is None):
+        return make_cursor_links(scheme, netloc, path, query, data)
+
+    if data.get("count_type", CountOption.exact) != CountOption.exact:
+        return make_uncounted_links(scheme, netloc, path, query, data)
+
     count = data["count"]
     limit = data["params"].get("limit", 10)
     offset = data["params"].get("offset", 0)
@@ -142,17 +258,101 @@ def make_links(scheme, netloc, path, query, data):
     return pagination_links
 
 
-def make_pagination_query_str(query, limit, offset=0):
+def make_cursor_links(scheme, netloc, path, query, data):
+    """
+    Creates links for keyset pagination where each page starts after the last
+    entity of the previous one. Only first and next links can be made without
+    counting how many entities come before the current page.
+    Arguments:
+        scheme: str
+        netloc: str
+        path: str
+        query: query string of incoming request
+        data: dict that contains all the required data for a search query see get_entity_search
+    """
+
+    from urllib.parse import urlunsplit
+
+    count = data["count"]
+    limit = data["params"].get("limit", 10)
+    entities = data.get("entities", [])
+    count_is_exact = data.get("count_type", CountOption.exact) == CountOption.exact
+    # a full page means there may be more entities after the last one
+    page_is_full = bool(entities) and len(entities) >= limit
+
+    if not limit or (count_is_exact and (count == 0 or count <= limit)):
+        # no pagination links needed
+        return {}
+
+    if data["params"].get("after") is None and not page_is_full:
+        # the first page is the only one
+        return {}
+
+    query_str = make_pagination_query_str(query, limit)
+    pagination_links = {"first": urlunsplit((scheme, netloc, path, query_str, ""))}
+
+    if page_is_full:
+        query_str = make_pagination_query_str(query, limit, after=entities[-1].entity)
+        pagination_links["next"] = urlunsplit((scheme, netloc, path, query_str, ""))
+
+    return pagination_links
+
+
+def make_uncounted_links(scheme, netloc, path, query, data):
+    """
+    Creates offset links when the count is estimated, capped or skipped so the
+    number of pages isn't known. There is no last link and a next link is only
+    made when the current page is full.
+    Arguments:
+        scheme: str
+        netloc: str
+        path: str
+        query: query string of incoming request
+        data: dict that contains all the required data for a search query see get_entity_search
+    """
+
+    from urllib.parse import urlunsplit
+
+    limit = data["params"].get("limit", 10)
+    offset = data["params"].get("offset", 0)
+    entities = data.get("entities", [])
+    page_is_full = len(entities) >= limit
+
+    if not limit or (offset == 0 and not page_is_full):
+        # no pagination links needed
+        return {}
+
+    query_str = make_pagination_query_str(query, limit)
+    pagination_links = {"first": urlunsplit((scheme, netloc, path, query_str, ""))}
+
+    if page_is_full:
+        query_str = make_pagination_query_str(query, limit, offset=offset + limit)
+        pagination_links["next"] = urlunsplit((scheme, netloc, path, query_str, ""))
+
+    if offset != 0:
+        prev_offset = max(offset - limit, 0)
+        query_str = make_pagination_query_str(query, limit, offset=prev_offset)
+        pagination_links["prev"] = urlunsplit((scheme, netloc, path, query_str, ""))
+
+    return pagination_links
+
+
+def make_pagination_query_str(query, limit, offset=0, after=None):
     from urllib.parse import parse_qs, urlencode
 
     query_dict = parse_qs(query)
 
     query_dict["limit"] = limit
 
-    if offset != 0:
+    if after is not None:
+        query_dict["after"] = after
+        query_dict.pop("offset", None)
+    elif offset != 0:
         query_dict["offset"] = offset
+        query_dict.pop("after", None)
     else:
         query_dict.pop("offset", None)
+        query_dict.pop("after", None)
 
     return urlencode(query_dict, doseq=True)
 
@@ -1,14 +1,17 @@
 import logging
 from typing import List
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, literal_column
 
+from application.core.cache import LRUCache
 from application.core.models import (
     DatasetModel,
     TypologyModel,
     OrganisationModel,
     DatasetCollectionModel,
     DatasetPublicationCountModel,
+    DataVersionModel,
 )
 from application.db.models import (
     DatasetOrm,
@@ -18,9 +21,19 @@ from application.db.models import (
     DatasetCollectionOrm,
     DatasetPublicationCountOrm,
 )
+from application.db.session import async_query
+from application.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
+# the data version is only looked up again once the cached one has expired
+_data_version_cache = LRUCache(
+    max_entries=1 if settings.DATA_VERSION_CHECK_SECONDS else 0,
+    ttl=settings.DATA_VERSION_CHECK_SECONDS,
+)
+
 
 def get_datasets(session: Session, datasets=None) -> List[DatasetModel]:
     query = (
@@ -115,3 +128,35 @@ def get_latest_resource(session: Session, dataset) -> DatasetCollectionModel:
         return DatasetCollectionModel.from_orm(result)
     else:
         return None
+
+
+def get_data_version(session: Session) -> DataVersionModel:
+    """
+    The version of the loaded data changes whenever the latest resource of
+    any dataset collection does, so it can be used to invalidate caches.
+    """
+    cached = _data_version_cache.get("data_version")
+    if cached is not None:
+        return cached
+
+    resources = func.concat(
+        DatasetCollectionOrm.dataset_collection, ":", DatasetCollectionOrm.resource
+    )
+    version, last_updated = session.query(
+        func.md5(
+            func.string_agg(
+                resources,
+                aggregate_order_by(
+                    literal_column("','"), DatasetCollectionOrm.dataset_collection
+                ),
+            )
+        ),
+        func.max(DatasetCollectionOrm.last_updated),
+    ).one()
+    data_version = DataVersionModel(version=version, last_updated=last_updated)
+    _data_version_cache.set("data_version", data_version)
+    return data_version
+
+
+# async variant for routes that run on the event loop
+get_data_version_async = async_query(get_data_version)
@@ -1,47 +1,227 @@
+import asyncio
+import json
 import logging
 
-from typing import Optional, List, Tuple
-from sqlalchemy import select, func, or_, and_, tuple_
-from sqlalchemy.orm import Session
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable, Iterator, Optional, List, Tuple
+from sqlalchemy import (
+    BIGINT,
+    Text,
+    bindparam,
+    literal,
+    select,
+    func,
+    null,
+    or_,
+    and_,
+    tuple_,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, defer, with_expression
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from starlette.concurrency import run_in_threadpool
 
-from application.core.models import EntityModel, entity_factory
+from application.core.cache import LRUCache
+from application.core.models import EntityModel, entity_factory, to_kebab
+from application.core.utils import to_snake
 from application.data_access.entity_query_helpers import (
+    NON_QUERY_PARAMS,
     get_date_field_to_filter,
     get_date_to_filter,
     get_operator,
     get_point,
     get_spatial_function_for_relation,
+    make_cache_key,
     normalised_params,
 )
-from application.db.models import EntityOrm, OldEntityOrm
-from application.search.enum import GeometryRelation, PeriodOption
-from sqlalchemy.types import Date
-from sqlalchemy.sql.expression import cast
+from application.data_access.digital_land_queries import (
+    get_data_version,
+    get_data_version_async,
+)
+from application.db.models import EntityOrm, OldEntityOrm, entity_event_date
+from application.db.session import AsyncSessionLocal
+from application.search.enum import CountOption, GeometryRelation, PeriodOption
+from application.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+# the most rows counted when the capped count option is used
+CAPPED_COUNT = 10000
+
+# the number of rows fetched from the server side cursor at a time by exports
+EXPORT_BATCH_SIZE = 1000
+
+# columns of the entity table which back EntityOrm attributes, rather than
+# being fields of an entity, so are never selected by name
+ENTITY_INTERNAL_COLUMNS = (
+    "geometry_geojson",
+    "point_geojson",
+    "geometry_is_valid",
+    "point_is_valid",
+)
+
+settings = get_settings()
+
+# search results are cached by their normalised parameters until the data changes
+_search_cache = LRUCache(
+    max_entries=settings.SEARCH_CACHE_SIZE,
+    max_weight=settings.SEARCH_CACHE_MAX_BYTES,
+    ttl=settings.SEARCH_CACHE_TTL_SECONDS,
+)
+
+# the json fields of each dataset, used as the columns of csv exports
+_dataset_fields_cache = LRUCache(max_entries=settings.DATASET_FIELDS_CACHE_SIZE)
+
+# search statements are cached by their shape, the parameters given and any
+# values that change the SQL, and are run with the values of each search
+_search_statement_cache = LRUCache(max_entries=settings.SEARCH_STATEMENT_CACHE_SIZE)
+
+# the ids of old entities, so entities can be got without checking for one
+_old_entity_ids_cache = LRUCache(max_entries=1)
+
+# searches of sync sessions are counted on their own connection alongside
+# the page query
+_search_count_executor = (
+    ThreadPoolExecutor(
+        max_workers=settings.SEARCH_COUNT_THREADS, thread_name_prefix="search-count"
+    )
+    if settings.SEARCH_COUNT_THREADS
+    else None
+)
+
+# roughly the memory an entity takes beyond the length of its values
+ENTITY_OVERHEAD_BYTES = 1000
+
+# parameters whose values are passed to a cached statement
+PAGINATION_PARAMS = ("limit", "offset", "after")
+GEOMETRY_OUTPUT_PARAMS = ("simplify", "precision")
+
+# parameters of a search which don't change its page statement
+UNUSED_STATEMENT_PARAMS = NON_QUERY_PARAMS + ("count", "suffix")
+
+# datasets whose linked entities are ordered by event date, which are the
+# datasets of idx_entity_timetable_event_date
+TIMETABLE_DATASETS = ("local-plan-timetable",)
+
+# searches by location are rarely repeated so their statements aren't cached
+LOCATION_PARAMS = (
+    "longitude",
+    "latitude",
+    "geometry",
+    "geometry_entity",
+    "geometry_reference",
+    "geometry_curie",
+)
+
 
 def get_entity_query(
     session: Session,
     id: int,
+    simplify: Optional[float] = None,
+    precision: Optional[int] = None,
 ) -> Tuple[Optional[EntityModel], Optional[int], Optional[int]]:
-    old_entity = (
-        session.query(OldEntityOrm)
-        .filter(OldEntityOrm.old_entity_id == id)
-        .one_or_none()
+    """
+    Gets an entity, or the status and new entity of an old entity, which
+    takes precedence over an entity with the same id
+    """
+    entity, status, new_entity_id = get_entity_row(session, id, simplify, precision)
+    return (entity_factory(entity) if entity else None), status, new_entity_id
+
+
+async def get_entity_query_async(
+    session: AsyncSession,
+    id: int,
+    simplify: Optional[float] = None,
+    precision: Optional[int] = None,
+) -> Tuple[Optional[EntityModel], Optional[int], Optional[int]]:
+    """
+    get_entity_query for routes on the event loop. The entity is fetched
+    through the async session and made into a model in the threadpool, as
+    making the WKT of a large geometry would hold up the event loop.
+    """
+    entity, status, new_entity_id = await session.run_sync(
+        get_entity_row, id, simplify, precision
     )
-    if old_entity:
-        return (
-            None,
-            old_entity.status,
-            old_entity.new_entity_id,
+    if entity is None:
+        return None, status, new_entity_id
+    return await run_in_threadpool(entity_factory, entity), status, new_entity_id
+
+
+def get_entity_row(
+    session: Session,
+    id: int,
+    simplify: Optional[float] = None,
+    precision: Optional[int] = None,
+) -> Tuple[Optional[EntityOrm], Optional[int], Optional[int]]:
+    """
+    The EntityOrm of get_entity_query. Most ids aren't of old entities,
+    which the in memory index of them can tell without a query, and the rest
+    are looked up along with the entity in a single query.
+    """
+    if id is None:
+        return None, None, None
+    # ids such as organisation entities are held as strings
+    id = int(id)
+    options = _geometry_output_options(simplify, precision)
+    old_entity_ids = _get_old_entity_ids(session)
+    if old_entity_ids is not None and id not in old_entity_ids:
+        return session.query(EntityOrm).options(*options).get(id), None, None
+
+    requested = select(literal(id, BIGINT).label("entity")).subquery()
+    entity, status, new_entity_id, is_old_entity = (
+        session.query(
+            EntityOrm,
+            OldEntityOrm.status,
+            OldEntityOrm.new_entity_id,
+            OldEntityOrm.old_entity_id.isnot(None),
         )
-    else:
-        entity = session.query(EntityOrm).get(id)
-        if not entity:
-            return None, None, None
-        else:
-            return entity_factory(entity), None, None
+        .select_from(requested)
+        .outerjoin(OldEntityOrm, OldEntityOrm.old_entity_id == requested.c.entity)
+        .outerjoin(EntityOrm, EntityOrm.entity == requested.c.entity)
+        .options(*options)
+        .one()
+    )
+    if is_old_entity:
+        return None, status, new_entity_id
+    return entity, None, None
+
+
+class _SortedIds:
+    """
+    A set of ids held as a sorted array of 64 bit integers, which takes a
+    fraction of the memory of a set of ints
+    """
+
+    def __init__(self, ids: Iterable[int]):
+        self._ids = array("q", sorted(ids))
+
+    def __contains__(self, id: int) -> bool:
+        i = bisect_left(self._ids, id)
+        return i < len(self._ids) and self._ids[i] == id
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def _get_old_entity_ids(session: Session) -> Optional[_SortedIds]:
+    """
+    The ids of old entities, which are read once per data version. Without a
+    data version there's no telling when they've changed so there's no index.
+    """
+    version = get_data_version(session).version
+    if not version:
+        return None
+    old_entity_ids = _old_entity_ids_cache.get("old_entity_ids", version)
+    if old_entity_ids is None:
+        query = session.query(OldEntityOrm.old_entity_id)
+        old_entity_ids = _SortedIds(id for (id,) in query)
+        _old_entity_ids_cache.set("old_entity_ids", old_entity_ids, version)
+    return old_entity_ids
 
 
 def get_entity_count(session: Session, dataset: Optional[str] = None):
@@ -63,63 +243,502 @@ def get_entities(session, dataset: str, limit: int) -> List[EntityModel]:
     return [entity_factory(e) for e in entities]
 
 
-def get_entity_search(session: Session, parameters: dict):
+def get_entity_search(
+    session: Session, parameters: dict, unused_fields: Iterable[str] = ()
+):
+    """
+    Searches for entities. Fields the caller won't use, such as the
+    geometry of entities shown as GeoJSON, can be given as unused_fields
+    and aren't loaded, as with fields excluded by the parameters.
+    """
     params = normalised_params(parameters)
-    count: int
-    entities: list[EntityModel]
-
-    # get count
-    subquery = session.query(EntityOrm.entity)
-    subquery = _apply_base_filters(subquery, params)
-    subquery = _apply_date_filters(subquery, params)
-    subquery = _apply_location_filters(session, subquery, params)
-    subquery = _apply_period_option_filter(subquery, params).subquery()
-    count_query = session.query(func.count()).select_from(subquery)
-    count = count_query.scalar()
-
-    query_args = [EntityOrm]
-    query = session.query(*query_args)
+    unused_fields = frozenset(unused_fields)
+    if not _search_cache.enabled:
+        return _get_entity_search(session, params, unused_fields)
+
+    key = (make_cache_key(params), tuple(sorted(unused_fields)))
+    version = get_data_version(session).version
+    result = _search_cache.get(key, version)
+    if result is None:
+        result = _get_entity_search(session, params, unused_fields)
+        _search_cache.set(
+            key, result, version, weight=_approximate_size(result["entities"])
+        )
+    return _copy_search_result(result)
+
+
+async def get_entity_search_async(
+    session: AsyncSession, parameters: dict, unused_fields: Iterable[str] = ()
+):
+    """
+    get_entity_search for routes on the event loop. The page is fetched
+    through the async session and made into models in the threadpool.
+    """
+    params = normalised_params(parameters)
+    unused_fields = frozenset(unused_fields)
+    if not _search_cache.enabled:
+        return await _get_entity_search_async(session, params, unused_fields)
+
+    key = (make_cache_key(params), tuple(sorted(unused_fields)))
+    version = (await get_data_version_async(session)).version
+    result = _search_cache.get(key, version)
+    if result is None:
+        result = await _get_entity_search_async(session, params, unused_fields)
+        weight = await run_in_threadpool(_approximate_size, result["entities"])
+        _search_cache.set(key, result, version, weight=weight)
+    return _copy_search_result(result)
+
+
+def _copy_search_result(result: dict) -> dict:
+    # the lists are copied so callers can't change what's cached
+    return {
+        **result,
+        "params": dict(result["params"]),
+        "entities": list(result["entities"]),
+    }
+
+
+def get_entity_export(
+    session: Session, parameters: dict, unused_fields: Iterable[str] = ()
+) -> Iterator[EntityModel]:
+    """
+    Yields every entity matching the search parameters in entity order,
+    reading them from a server side cursor in batches so memory use doesn't
+    grow with the size of the export. The limit and offset are ignored but
+    after can be used to resume an export.
+    """
+    params = normalised_params(parameters)
+
+    query = session.query(EntityOrm)
+    query = _apply_search_filters(session, query, params)
+    query = query.order_by(EntityOrm.entity)
+    if params.get("after") is not None:
+        query = query.filter(EntityOrm.entity > params["after"])
+    query = _apply_exclusion_filters(query, params, unused_fields)
+
+    for entity_orm in query.yield_per(EXPORT_BATCH_SIZE):
+        yield entity_factory(entity_orm)
+
+
+def get_entity_export_fields(session: Session, parameters: dict) -> List[str]:
+    """
+    The json fields of the datasets with entities matching the search
+    parameters, so they can be flattened into columns of a csv export
+    before any entities are read
+    """
+    params = normalised_params(parameters)
+    datasets = params.get("dataset")
+    if not datasets:
+        query = session.query(EntityOrm.dataset).distinct()
+        query = _apply_search_filters(session, query, params)
+        datasets = [dataset for (dataset,) in query]
+
+    version = get_data_version(session).version
+    fields = set()
+    for dataset in datasets:
+        dataset_fields = _dataset_fields_cache.get(dataset, version)
+        if dataset_fields is None:
+            query = (
+                session.query(func.jsonb_object_keys(EntityOrm.json))
+                .filter(EntityOrm.dataset == dataset)
+                .filter(func.jsonb_typeof(EntityOrm.json) == "object")
+                .distinct()
+            )
+            dataset_fields = [field for (field,) in query]
+            _dataset_fields_cache.set(dataset, dataset_fields, version)
+        fields.update(dataset_fields)
+    return sorted(fields)
+
+
+def _get_entity_search(
+    session: Session, params: dict, unused_fields: Iterable[str] = ()
+):
+    count: Optional[int]
+    count_type: CountOption
+
+    count_option = params.get("count", CountOption.exact)
+    # the count runs alongside the page query when it can have its own
+    # connection, a window count over the page would make postgres read
+    # every match before the limit could return the page
+    pending_count = _start_search_count(session, params, count_option)
+
+    statement = _get_search_statement(session, params, unused_fields)
+    rows = session.execute(statement, _search_statement_values(params)).all()
+
+    if pending_count is not None:
+        count, count_type = pending_count.result()
+    else:
+        count, count_type = _get_search_count(session, params, count_option)
+
+    return {
+        "params": params,
+        "count": count,
+        "count_type": count_type,
+        "entities": _row_models(rows),
+    }
+
+
+async def _get_entity_search_async(
+    session: AsyncSession, params: dict, unused_fields: Iterable[str] = ()
+):
+    count_option = params.get("count", CountOption.exact)
+    # the statement is only built with the sync session, never run by it
+    statement = _get_search_statement(session.sync_session, params, unused_fields)
+    page = session.execute(statement, _search_statement_values(params))
+
+    # sessions only have a bind when they're given one
+    bind = getattr(session, "bind", None)
+    if count_option != CountOption.none and isinstance(bind, AsyncEngine):
+        # the count runs alongside the page query on its own session of the
+        # engine, a window count over the page would make postgres read
+        # every match before the limit could return the page
+        result, (count, count_type) = await asyncio.gather(
+            page, _get_search_count_async(bind, params, count_option)
+        )
+    else:
+        # a session bound to a single connection, such as one in an open
+        # transaction, can only run one query at a time
+        result = await page
+        count, count_type = await session.run_sync(
+            _get_search_count, params, count_option
+        )
+
+    return {
+        "params": params,
+        "count": count,
+        "count_type": count_type,
+        "entities": await run_in_threadpool(_row_models, result.all()),
+    }
+
+
+async def _get_search_count_async(
+    engine: AsyncEngine, params: dict, count_option: CountOption
+) -> Tuple[Optional[int], CountOption]:
+    async with AsyncSessionLocal(bind=engine) as count_session:
+        return await count_session.run_sync(_get_search_count, params, count_option)
+
+
+def _get_search_count(
+    session: Session, params: dict, count_option: CountOption
+) -> Tuple[Optional[int], CountOption]:
+    query = _apply_search_filters(session, session.query(EntityOrm.entity), params)
+    return _get_count(session, query, count_option)
+
+
+def _start_search_count(
+    session: Session, params: dict, count_option: CountOption
+) -> Optional[Future]:
+    """
+    Starts counting the search on another pooled connection of the session's
+    engine. Sessions bound to a single connection, such as one in an open
+    transaction, can't be shared with another thread so are counted after
+    the page. Searches through an AsyncSession are counted alongside the page
+    by get_entity_search_async.
+    """
+    bind = session.get_bind()
+    if (
+        _search_count_executor is None
+        or count_option == CountOption.none
+        or not isinstance(bind, Engine)
+        or bind.dialect.is_async
+    ):
+        return None
+
+    def count():
+        with Session(bind=bind) as count_session:
+            return _get_search_count(count_session, params, count_option)
+
+    return _search_count_executor.submit(count)
+
+
+def _get_search_statement(session: Session, params: dict, unused_fields: Iterable[str]):
+    """
+    The page statement of a search, reused for searches with the same shape
+    so it isn't built and its cache key isn't generated again. The values of
+    entity field and pagination parameters are bound by name.
+    """
+    shape = _search_shape(params, unused_fields)
+    statement = _search_statement_cache.get(shape) if shape is not None else None
+    if statement is not None:
+        return statement
+
+    query = session.query(EntityOrm)
+    query = _apply_search_filters(session, query, params)
+    query = _apply_limit_and_pagination_filters(query, params)
+    if params.get("field"):
+        query = _apply_field_projection(query, params)
+    else:
+        query = _apply_exclusion_filters(query, params, unused_fields)
+
+    statement = query.statement
+    if shape is not None:
+        _search_statement_cache.set(shape, statement)
+    return statement
+
+
+def _is_bound_param(key: str) -> bool:
+    # see _apply_base_filters, _apply_limit_and_pagination_filters,
+    # _simplified_geometry and _precision_digits
+    return (
+        key in PAGINATION_PARAMS
+        or key in GEOMETRY_OUTPUT_PARAMS
+        or (key != "geometry" and hasattr(EntityOrm, key))
+    )
+
+
+def _search_shape(params: dict, unused_fields: Iterable[str]) -> Optional[Hashable]:
+    """
+    The key of a search's statement in the statement cache. Bound params are
+    keyed by whether they're lists, or for simplify whether it's used, and
+    other params by their values, as they change the SQL. So searches with
+    many different dates, curies, organisations or fields each have their
+    own statement and share SEARCH_STATEMENT_CACHE_SIZE with the rest.
+    """
+    if any(key in params for key in LOCATION_PARAMS):
+        return None
+    shape = []
+    for key, value in params.items():
+        if key in UNUSED_STATEMENT_PARAMS:
+            continue
+        if key == "simplify":
+            shape.append((key, bool(value)))
+        elif _is_bound_param(key):
+            shape.append((key, isinstance(value, list)))
+        else:
+            shape.append((key, tuple(value) if isinstance(value, list) else value))
+    return tuple(sorted(shape)), tuple(sorted(unused_fields))
+
+
+def _search_statement_values(params: dict) -> dict:
+    return {key: value for key, value in params.items() if _is_bound_param(key)}
+
+
+def _geometry_output_options(
+    simplify: Optional[float] = None,
+    precision: Optional[int] = None,
+    excluded: Iterable[str] = (),
+) -> list:
+    """
+    Loader options for the geometry of entities. Excluded geometry, point
+    and geojson fields are never loaded, and with simplify or precision the
+    GeoJSON and WKT geometry are made in the database with the full geometry
+    and point columns deferred.
+    """
+    simplified = bool(simplify) or precision is not None
+    digits = _precision_digits(precision)
+    geometry = _simplified_geometry(EntityOrm.geometry, simplify)
+    options = []
+
+    if "geojson" in excluded:
+        options.append(with_expression(EntityOrm._geojson, null()))
+    elif simplified:
+        options.append(
+            with_expression(EntityOrm._geojson, _geojson_output(simplify, precision))
+        )
+
+    for column, wkt, output in [
+        (EntityOrm.geometry, EntityOrm._geometry_wkt, geometry),
+        (EntityOrm.point, EntityOrm._point_wkt, EntityOrm.point),
+    ]:
+        if column.key in excluded:
+            options.append(defer(column))
+        elif simplified:
+            options.append(defer(column))
+            options.append(with_expression(wkt, func.ST_AsText(output, *digits)))
+
+    return options
+
+
+def _geojson_output(simplify: Optional[float] = None, precision: Optional[int] = None):
+    """
+    The GeoJSON geometry of entities as text, the stored GeoJSON unless it
+    needs to be made simplified or with fewer decimal places
+    """
+    if not simplify and precision is None:
+        table = EntityOrm.__table__
+        return func.coalesce(table.c.geometry_geojson, table.c.point_geojson)
+    digits = _precision_digits(precision)
+    return func.coalesce(
+        func.ST_AsGeoJSON(_simplified_geometry(EntityOrm.geometry, simplify), *digits),
+        func.ST_AsGeoJSON(EntityOrm.point, *digits),
+    )
+
+
+def _simplified_geometry(geometry, simplify: Optional[float] = None):
+    # the tolerance is bound by name so a cached statement can be run with
+    # another tolerance
+    if simplify:
+        return func.ST_SimplifyPreserveTopology(
+            geometry, bindparam("simplify", simplify)
+        )
+    return geometry
+
+
+def _precision_digits(precision: Optional[int] = None) -> list:
+    # the decimal places given to ST_AsGeoJSON and ST_AsText, bound by name
+    # as the simplify tolerance is
+    return [] if precision is None else [bindparam("precision", precision)]
+
+
+def _apply_field_projection(query, params):
+    """
+    Selects only the entity and the requested fields, reading fields from
+    the json with the -> operator, so a request for a few fields doesn't
+    load the geometry or the whole json of each entity. The geojson is
+    read from the stored GeoJSON columns rather than the json.
+    """
+    fields = {to_snake(field) for field in params["field"]}
+    columns = {
+        column.name: column
+        for column in EntityOrm.__table__.columns
+        if column.name not in ENTITY_INTERNAL_COLUMNS
+    }
+    simplify = params.get("simplify")
+    precision = params.get("precision")
+
+    selected_columns = [EntityOrm.entity]
+    json_fields = []
+    for field in sorted(fields - {"entity"}):
+        if field == "geojson":
+            # read as text and made into a feature by EntityGetterDict
+            selected_columns.append(
+                _geojson_output(simplify, precision).label("geojson")
+            )
+        elif field not in columns:
+            json_fields.append(field)
+        elif field in ("geometry", "point") and (simplify or precision is not None):
+            if field == "geometry":
+                geometry = _simplified_geometry(columns[field], simplify)
+            else:
+                geometry = columns[field]
+            digits = _precision_digits(precision)
+            selected_columns.append(func.ST_AsText(geometry, *digits).label(field))
+        else:
+            selected_columns.append(columns[field])
+
+    if json_fields and "json" not in fields:
+        # json keys are kebab case but can be requested in either form
+        values = []
+        for field in json_fields:
+            value = EntityOrm.json[to_kebab(field)]
+            if to_kebab(field) != field:
+                value = func.coalesce(value, EntityOrm.json[field])
+            # typed so drivers preparing the statement, such as asyncpg,
+            # know the type of the key parameters
+            values.extend([literal(to_kebab(field), Text), value])
+        selected_columns.append(
+            func.jsonb_strip_nulls(func.jsonb_build_object(*values)).label("json")
+        )
+
+    return query.with_entities(*selected_columns)
+
+
+def _apply_search_filters(session: Session, query, params):
     query = _apply_base_filters(query, params)
     query = _apply_date_filters(query, params)
     query = _apply_location_filters(session, query, params)
-    query = _apply_period_option_filter(query, params)
-    query = _apply_limit_and_pagination_filters(query, params)
-    query = _apply_exclusion_filters(
-        query, params
-    )  # Build the query without excluded params
-    entities = query.all()
-    entities = [entity_factory(entity_orm) for entity_orm in entities]
-    return {"params": params, "count": count, "entities": entities}
+    return _apply_period_option_filter(query, params)
 
 
-def _apply_exclusion_filters(query, params):
-    exclude_fields = params.get("exclude_field", [])
-    if exclude_fields:
-        # Split the comma-separated string into a list of individual fields
-        split_strings = [
-            s.strip() for sub in exclude_fields for s in sub.split(",") if s
-        ]
-        exclude_fields = set(split_strings)
-        all_columns = {column.name for column in EntityOrm.__table__.columns}
-
-        # Exclude fields not present in the table schema
-        exclude_fields = {field for field in exclude_fields if field in all_columns}
-        # Dynamically construct the selected columns by excluding the specified fields
-        selected_columns = [
-            column
-            for column in EntityOrm.__table__.columns
-            if column.name not in exclude_fields
-        ]
+def _row_entity(row):
+    # rows are an EntityOrm or, when fields are excluded, the selected columns
+    return row[0] if isinstance(row[0], EntityOrm) else row
 
-        if not selected_columns:
-            raise ValueError(
-                "No columns left to select after exclusions. Please check the field names."
-            )
 
-        # Modify the query to select only the desired columns
-        query = query.with_entities(*selected_columns)
+def _row_models(rows) -> List[EntityModel]:
+    return [entity_factory(_row_entity(row)) for row in rows]
+
+
+def _approximate_size(entities: List[EntityModel]) -> int:
+    """
+    Roughly the bytes held by a list of entities, from the length of their
+    values, so the search cache is bounded by memory rather than entities
+    """
+    size = 0
+    for entity in entities:
+        size += ENTITY_OVERHEAD_BYTES
+        for value in entity.__dict__.values():
+            if isinstance(value, str):
+                size += len(value)
+            elif value is not None:
+                size += len(str(value))
+    return size
+
+
+def _get_count(
+    session: Session, query, option: CountOption
+) -> Tuple[Optional[int], CountOption]:
+    """
+    Counts the rows of a filtered query using the requested strategy. Returns the
+    count and how it was arrived at, a capped count only stays capped when there
+    are more rows than the cap.
+    """
+    if option == CountOption.none:
+        return None, CountOption.none
+
+    if option == CountOption.estimate:
+        return _get_estimated_count(session, query), CountOption.estimate
+
+    if option == CountOption.capped:
+        subquery = query.limit(CAPPED_COUNT + 1).subquery()
+        count = session.query(func.count()).select_from(subquery).scalar()
+        if count > CAPPED_COUNT:
+            return CAPPED_COUNT, CountOption.capped
+        return count, CountOption.exact
+
+    count = session.query(func.count()).select_from(query.subquery()).scalar()
+    return count, CountOption.exact
 
-    return query
+
+class _Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) of a statement, executed like any other statement
+    so its parameters are bound the way the session's driver expects
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _get_estimated_count(session: Session, query) -> int:
+    """
+    Uses the row estimate from the planner so the query itself never runs
+    """
+    plan = session.execute(_Explain(query.statement)).scalar()
+    if isinstance(plan, str):
+        # drivers without a json codec return the plan as text
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _apply_exclusion_filters(query, params, unused_fields: Iterable[str] = ()):
+    """
+    Defers the columns of fields excluded by the parameters, or unused by the
+    caller, so they're never loaded. Geometry output options are applied too.
+    """
+    excluded = set(unused_fields)
+    for fields in params.get("exclude_field") or []:
+        # each may be a comma-separated string of fields
+        excluded.update(to_snake(field.strip()) for field in fields.split(","))
+
+    options = [
+        defer(getattr(EntityOrm, column.name))
+        for column in EntityOrm.__table__.columns
+        if column.name in excluded
+        and column.name not in ENTITY_INTERNAL_COLUMNS
+        and column.name not in ("entity", "geometry", "point")
+    ]
+    options += _geometry_output_options(
+        params.get("simplify"), params.get("precision"), excluded
+    )
+    return query.options(*options)
 
 
 def lookup_entity_link(
@@ -129,21 +748,64 @@ def lookup_entity_link(
     This function takes an entity and a list of fields that are entity links.
     any entity link fields are then replaced with the entity object.
     """
-    search_params = {
-        "reference": [reference],
-        "dataset": [dataset],
-        "organisation-entity": [organisation_entity],
+    # the organisation was never matched, the search parameter for it was
+    # named organisation-entity so didn't match a column
+    return lookup_entity_links(session, [(dataset, reference, None)]).get(
+        (dataset, reference, None)
+    )
+
+
+def lookup_entity_links(
+    session: Session, links: Iterable[Tuple[str, str, Optional[int]]]
+) -> Dict[Tuple[str, str, Optional[int]], dict]:
+    """
+    Resolves (dataset, reference, organisation entity) links to the entity
+    they refer to in a single query. An organisation entity of None matches
+    any organisation. Links are only resolved when exactly one entity
+    matches, those that aren't are left out of the returned dict.
+    """
+    return {
+        link: entity_factory(entity_orm).dict(by_alias=True, exclude={"geojson"})
+        for link, entity_orm in lookup_entity_link_rows(session, links).items()
     }
-    found_entities = get_entity_search(session, search_params)
-    if found_entities["count"] == 1:
-        found_entity = found_entities["entities"][0]
-        return found_entity.dict(by_alias=True, exclude={"geojson"})
-    # elif found_entities["count"] > 1:
-    # Log that multiple entities were found
-    # set the entity to -1 so the page not found page is shown
-    # elif found_entities["count"] == 0:
-    # Log that no entity was found
-    # set the entity to -1 so the page not found page is shown
+
+
+def lookup_entity_link_rows(
+    session: Session, links: Iterable[Tuple[str, str, Optional[int]]]
+) -> Dict[Tuple[str, str, Optional[int]], EntityOrm]:
+    """
+    The EntityOrm each link of lookup_entity_links resolves to
+    """
+    links = [
+        (dataset, reference, organisation_entity)
+        for dataset, reference, organisation_entity in links
+        # references are strings, anything else can't match one
+        if dataset and reference and isinstance(reference, str)
+    ]
+    if not links:
+        return {}
+
+    pairs = {(dataset, reference) for dataset, reference, _ in links}
+    query = session.query(EntityOrm).filter(
+        tuple_(EntityOrm.dataset, EntityOrm.reference).in_(pairs)
+    )
+    query = _apply_exclusion_filters(query, {})
+
+    found = defaultdict(list)
+    for entity_orm in query:
+        found[(entity_orm.dataset, entity_orm.reference)].append(entity_orm)
+
+    resolved = {}
+    for dataset, reference, organisation_entity in links:
+        matches = [
+            entity_orm
+            for entity_orm in found[(dataset, reference)]
+            if organisation_entity is None
+            or entity_orm.organisation_entity == organisation_entity
+        ]
+        if len(matches) == 1:
+            resolved[(dataset, reference, organisation_entity)] = matches[0]
+    return resolved
 
 
 def _apply_base_filters(query, params):
@@ -152,11 +814,12 @@ def _apply_base_filters(query, params):
 
     for key, val in params.items():
         if key not in excluded and hasattr(EntityOrm, key):
+            # bound by name so a cached statement can be run with other values
             field = getattr(EntityOrm, key)
             if isinstance(val, list):
-                query = query.filter(field.in_(val))
+                query = query.filter(field.in_(bindparam(key, val, expanding=True)))
             else:
-                query = query.filter(field == val)
+                query = query.filter(field == bindparam(key, val))
 
     if params.get("curie") is not None:
         curies = params.get("curie")
@@ -197,7 +860,7 @@ def _apply_location_filters(session, query, params):
         query = query.filter(
             and_(
                 EntityOrm.geometry.is_not(None),
-                func.ST_IsValid(EntityOrm.geometry),
+                EntityOrm.geometry_is_valid,
                 func.ST_Contains(EntityOrm.geometry, func.ST_GeomFromText(point, 4326)),
             )
         )
@@ -212,7 +875,7 @@ def _apply_location_filters(session, query, params):
             or_(
                 and_(
                     EntityOrm.geometry.is_not(None),
-                    func.ST_IsValid(EntityOrm.geometry),
+                    EntityOrm.geometry_is_valid,
                     spatial_function(
                         EntityOrm.geometry,
                         func.ST_GeomFromText(geometry, 4326),
@@ -220,7 +883,7 @@ def _apply_location_filters(session, query, params):
                 ),
                 and_(
                     EntityOrm.point.is_not(None),
-                    func.ST_IsValid(EntityOrm.point),
+                    EntityOrm.point_is_valid,
                     spatial_function(
                         EntityOrm.point, func.ST_GeomFromText(geometry, 4326)
                     ),
@@ -232,7 +895,7 @@ def _apply_location_filters(session, query, params):
     intersecting_entities = params.get("geometry_entity", [])
     if intersecting_entities:
         intersecting_entities_query = (
-            session.query(EntityOrm.geometry)
+            session.query(EntityOrm.geometry, EntityOrm.geometry_is_valid)
             .filter(EntityOrm.entity.in_(intersecting_entities))
             .group_by(EntityOrm.entity)
             .subquery()
@@ -243,8 +906,8 @@ def _apply_location_filters(session, query, params):
             or_(
                 and_(
                     EntityOrm.geometry.is_not(None),
-                    func.ST_IsValid(EntityOrm.geometry),
-                    func.ST_IsValid(intersecting_entities_query.c.geometry),
+                    EntityOrm.geometry_is_valid,
+                    intersecting_entities_query.c.geometry_is_valid,
                     spatial_function(
                         EntityOrm.geometry,
                         intersecting_entities_query.c.geometry,
@@ -252,7 +915,7 @@ def _apply_location_filters(session, query, params):
                 ),
                 and_(
                     EntityOrm.point.is_not(None),
-                    func.ST_IsValid(intersecting_entities_query.c.geometry),
+                    intersecting_entities_query.c.geometry_is_valid,
                     spatial_function(
                         EntityOrm.point, intersecting_entities_query.c.geometry
                     ),
@@ -263,7 +926,7 @@ def _apply_location_filters(session, query, params):
     references = params.get("geometry_reference", [])
     if references:
         reference_query = (
-            session.query(EntityOrm.geometry)
+            session.query(EntityOrm.geometry, EntityOrm.geometry_is_valid)
             .filter(EntityOrm.reference.in_(references))
             .group_by(EntityOrm)
             .subquery()
@@ -273,13 +936,13 @@ def _apply_location_filters(session, query, params):
             or_(
                 and_(
                     EntityOrm.geometry.is_not(None),
-                    func.ST_IsValid(EntityOrm.geometry),
-                    func.ST_IsValid(reference_query.c.geometry),
+                    EntityOrm.geometry_is_valid,
+                    reference_query.c.geometry_is_valid,
                     spatial_function(EntityOrm.geometry, reference_query.c.geometry),
                 ),
                 and_(
                     EntityOrm.point.is_not(None),
-                    func.ST_IsValid(reference_query.c.geometry),
+                    reference_query.c.geometry_is_valid,
                     spatial_function(EntityOrm.point, reference_query.c.geometry),
                 ),
             ),
@@ -289,7 +952,7 @@ def _apply_location_filters(session, query, params):
     if curies:
         split_curies = [tuple(curie.split(":")) for curie in curies]
         curie_query = (
-            session.query(EntityOrm.geometry)
+            session.query(EntityOrm.geometry, EntityOrm.geometry_is_valid)
             .filter(tuple_(EntityOrm.prefix, EntityOrm.reference).in_(split_curies))
             .group_by(EntityOrm)
             .subquery()
@@ -299,13 +962,13 @@ def _apply_location_filters(session, query, params):
             or_(
                 and_(
                     EntityOrm.geometry.is_not(None),
-                    func.ST_IsValid(EntityOrm.geometry),
-                    func.ST_IsValid(curie_query.c.geometry),
+                    EntityOrm.geometry_is_valid,
+                    curie_query.c.geometry_is_valid,
                     spatial_function(EntityOrm.geometry, curie_query.c.geometry),
                 ),
                 and_(
                     EntityOrm.point.is_not(None),
-                    func.ST_IsValid(curie_query.c.geometry),
+                    curie_query.c.geometry_is_valid,
                     spatial_function(EntityOrm.point, curie_query.c.geometry),
                 ),
             ),
@@ -339,10 +1002,13 @@ def _apply_period_option_filter(query, params):
 
 def _apply_limit_and_pagination_filters(query, params):
     query = query.order_by(EntityOrm.entity)
+    # keyset pagination turns deep pages into a range scan on the primary key
+    if params.get("after") is not None:
+        query = query.filter(EntityOrm.entity > bindparam("after", params["after"]))
+    elif params.get("offset") is not None:
+        query = query.offset(bindparam("offset", params["offset"]))
     if params.get("limit") is not None:
-        query = query.limit(params["limit"])
-    if params.get("offset") is not None:
-        query = query.offset(params["offset"])
+        query = query.limit(bindparam("limit", params["limit"]))
     return query
 
 
@@ -355,13 +1021,102 @@ def get_linked_entities(
         .filter(EntityOrm.json.contains({linked_dataset: reference}))
     )
 
-    if dataset in ["local-plan-timetable"]:
-        query = query.order_by(cast(EntityOrm.json["event-date"].astext, Date).desc())
+    if dataset in TIMETABLE_DATASETS:
+        query = query.order_by(entity_event_date.desc())
 
     entities = query.all()
     return [entity_factory(e) for e in entities]
 
 
+def get_linked_entities_by_dataset(
+    session: Session, datasets: Iterable[str], reference: str, linked_dataset: str
+) -> Dict[str, List[EntityModel]]:
+    """
+    The entities of each of the datasets which link to the reference of the
+    linked dataset, fetched together rather than with a query per dataset as
+    get_linked_entities does. Every dataset has a list, empty when nothing
+    links to the reference. Timetables are fetched on their own, ordered by
+    event date with the most recent first, so the query can use the partial
+    index on their event date.
+    """
+    linked = get_linked_entity_rows_by_dataset(
+        session, datasets, reference, linked_dataset
+    )
+    return {
+        dataset: [entity_factory(entity) for entity in entities]
+        for dataset, entities in linked.items()
+    }
+
+
+def get_linked_entity_rows_by_dataset(
+    session: Session, datasets: Iterable[str], reference: str, linked_dataset: str
+) -> Dict[str, List[EntityOrm]]:
+    """
+    The EntityOrm of get_linked_entities_by_dataset
+    """
+    datasets = list(datasets)
+    linked = {dataset: [] for dataset in datasets}
+    others = [dataset for dataset in datasets if dataset not in TIMETABLE_DATASETS]
+    timetables = [dataset for dataset in datasets if dataset in TIMETABLE_DATASETS]
+
+    queries = []
+    if others:
+        queries.append(
+            session.query(EntityOrm)
+            .filter(EntityOrm.dataset.in_(others))
+            .filter(EntityOrm.json.contains({linked_dataset: reference}))
+        )
+    for dataset in timetables:
+        # the dataset is rendered in the SQL so a prepared statement's plan
+        # can still use the partial index
+        queries.append(
+            session.query(EntityOrm)
+            .filter(
+                EntityOrm.dataset == bindparam("dataset", dataset, literal_execute=True)
+            )
+            .filter(EntityOrm.json.contains({linked_dataset: reference}))
+            .order_by(entity_event_date.desc())
+        )
+
+    for query in queries:
+        for entity in query:
+            linked[entity.dataset].append(entity)
+    return linked
+
+
+def get_entities_by_reference(
+    session: Session, references: Iterable[Tuple[str, str]]
+) -> Dict[Tuple[str, str], EntityModel]:
+    """
+    Fetches the entities for (dataset, reference) pairs in one query. Pairs
+    which don't match exactly one entity are left out of the returned dict.
+    """
+    return {
+        pair: entity_factory(entity)
+        for pair, entity in get_entity_rows_by_reference(session, references).items()
+    }
+
+
+def get_entity_rows_by_reference(
+    session: Session, references: Iterable[Tuple[str, str]]
+) -> Dict[Tuple[str, str], EntityOrm]:
+    """
+    The EntityOrm of get_entities_by_reference
+    """
+    pairs = {(dataset, reference) for dataset, reference in references if reference}
+    if not pairs:
+        return {}
+
+    query = session.query(EntityOrm).filter(
+        tuple_(EntityOrm.dataset, EntityOrm.reference).in_(pairs)
+    )
+
+    found = defaultdict(list)
+    for entity in query:
+        found[(entity.dataset, entity.reference)].append(entity)
+    return {pair: entities[0] for pair, entities in found.items() if len(entities) == 1}
+
+
 def fetchEntityFromReference(
     session: Session, dataset: str, reference: str
 ) -> EntityModel:
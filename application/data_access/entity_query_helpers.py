@@ -70,6 +70,10 @@ def get_spatial_function_for_relation(relation):
     return func.ST_Within
 
 
+# params given with a search which don't change its results
+NON_QUERY_PARAMS = ("accept",)
+
+
 def normalised_params(params):
     lists = [
         "typology",
@@ -80,7 +84,11 @@ def normalised_params(params):
         "organisation_entity",
     ]
 
-    params = {k: v for k, v in params.items() if v}
+    # zero is meaningful for these, e.g. after=0 is the cursor for the first page
+    zero_allowed = ["after", "precision"]
+    params = {
+        k: v for k, v in params.items() if v or (k in zero_allowed and v is not None)
+    }
 
     for lst in lists:
         if lst in params:
@@ -88,3 +96,19 @@ def normalised_params(params):
             params[lst] = sorted(set(params[lst]))
 
     return params
+
+
+def make_cache_key(params):
+    """
+    Makes a hashable key from normalised params so the same search made with
+    parameters in a different order or with repeated values shares a key.
+    Params that don't change the results, such as the accept header, are left
+    out of the key.
+    """
+    return tuple(
+        sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in params.items()
+            if key not in NON_QUERY_PARAMS
+        )
+    )
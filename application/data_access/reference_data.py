@@ -0,0 +1,141 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from application.core.models import (
+    DatasetModel,
+    EntityModel,
+    OrganisationModel,
+    TypologyModel,
+)
+from application.data_access import (
+    dataset_queries,
+    digital_land_queries,
+    entity_queries,
+)
+from application.db.session import async_query, get_context_session
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceDataSnapshot:
+    """
+    Reference data, such as the datasets and typologies, which only changes
+    when data is loaded. Each item is read once per data version and kept in
+    memory. When the version changes the values already held are served while
+    they're read again in the background.
+
+    Without a data version there's no way to tell when the data changes, so
+    items are read each time they're needed.
+    """
+
+    def __init__(self):
+        self._values: Dict[Hashable, Tuple[Any, Any]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, key: Hashable, loader: Callable[[Session], Any]):
+        version = digital_land_queries.get_data_version(session).version
+        if version is None:
+            return loader(session)
+
+        with self._lock:
+            held = self._values.get(key)
+            if held is not None:
+                held_version, value = held
+                if held_version != version and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._refresh,
+                        args=(key, loader, version),
+                        name=f"reference-data-{key}",
+                        daemon=True,
+                    ).start()
+                return value
+
+        value = loader(session)
+        with self._lock:
+            self._values[key] = (version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _refresh(self, key: Hashable, loader: Callable[[Session], Any], version):
+        try:
+            with get_context_session() as session:
+                value = loader(session)
+            with self._lock:
+                self._values[key] = (version, value)
+        except Exception as e:
+            logger.exception(f"failed to refresh reference data {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+_snapshot = ReferenceDataSnapshot()
+
+
+def get_dataset_names(session: Session) -> List[str]:
+    return list(
+        _snapshot.get(session, "dataset_names", dataset_queries.get_dataset_names)
+    )
+
+
+def get_typology_names(session: Session) -> List[str]:
+    return list(
+        _snapshot.get(
+            session, "typology_names", digital_land_queries.get_typology_names
+        )
+    )
+
+
+def get_typologies_with_entities(session: Session) -> List[TypologyModel]:
+    return list(
+        _snapshot.get(
+            session,
+            "typologies_with_entities",
+            digital_land_queries.get_typologies_with_entities,
+        )
+    )
+
+
+def get_datasets(session: Session, datasets=None) -> List[DatasetModel]:
+    all_datasets = _snapshot.get(session, "datasets", digital_land_queries.get_datasets)
+    if datasets:
+        datasets = set(datasets)
+        return [dataset for dataset in all_datasets if dataset.dataset in datasets]
+    return list(all_datasets)
+
+
+def get_local_authorities(
+    session: Session, local_authority_region
+) -> List[OrganisationModel]:
+    return list(
+        _snapshot.get(
+            session,
+            ("local_authorities", local_authority_region),
+            lambda session: digital_land_queries.get_local_authorities(
+                session, local_authority_region
+            ),
+        )
+    )
+
+
+def get_organisations(session: Session) -> List[EntityModel]:
+    return list(
+        _snapshot.get(session, "organisations", entity_queries.get_organisations)
+    )
+
+
+# async variants for routes that run on the event loop
+get_dataset_names_async = async_query(get_dataset_names)
+get_typology_names_async = async_query(get_typology_names)
+get_typologies_with_entities_async = async_query(get_typologies_with_entities)
+get_datasets_async = async_query(get_datasets)
+get_local_authorities_async = async_query(get_local_authorities)
+get_organisations_async = async_query(get_organisations)
@@ -1,17 +1,31 @@
-import json
 from datetime import datetime
 from geoalchemy2 import Geometry
-from sqlalchemy import Column, Date, BIGINT, Text, Index, Integer, cast, func
+from sqlalchemy import (
+    Column,
+    Computed,
+    Date,
+    BIGINT,
+    Boolean,
+    Text,
+    Index,
+    Integer,
+    cast,
+    func,
+)
 from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.elements import Grouping
 from sqlalchemy.orm import (
     relationship,
     foreign,
     remote,
-    column_property,
+    deferred,
+    query_expression,
 )
 
+from application.core.utils import RawJSON
+
 Base = declarative_base()
 
 
@@ -31,17 +45,44 @@ class EntityOrm(Base):
     typology = Column(Text, nullable=True)
     geometry = Column(Geometry(geometry_type="MULTIPOLYGON", srid=4326), nullable=True)
     point = Column(Geometry(geometry_type="POINT", srid=4326), nullable=True)
-    _geometry_geojson = column_property(func.ST_AsGeoJSON(geometry))
-    _point_geojson = column_property(func.ST_AsGeoJSON(point))
+    geometry_is_valid = Column(
+        Boolean, Computed("ST_IsValid(geometry)", persisted=True), nullable=True
+    )
+    point_is_valid = Column(
+        Boolean, Computed("ST_IsValid(point)", persisted=True), nullable=True
+    )
+    # GeoJSON is stored when rows are loaded, and read through _geojson which
+    # searches can replace with a simplified version using with_expression
+    _geometry_geojson = deferred(
+        Column(
+            "geometry_geojson",
+            Text,
+            Computed("ST_AsGeoJSON(geometry)", persisted=True),
+            nullable=True,
+        )
+    )
+    _point_geojson = deferred(
+        Column(
+            "point_geojson",
+            Text,
+            Computed("ST_AsGeoJSON(point)", persisted=True),
+            nullable=True,
+        )
+    )
+    _geojson = query_expression(
+        default_expr=func.coalesce(
+            _geometry_geojson.columns[0], _point_geojson.columns[0]
+        )
+    )
+    # WKT of a simplified geometry and point, loaded with with_expression
+    # by searches which defer the geometry and point columns
+    _geometry_wkt = query_expression()
+    _point_wkt = query_expression()
 
     @hybrid_property
     def geojson(self):
-        if self._geometry_geojson is not None:
-            geometry = json.loads(self._geometry_geojson)
-            return {"geometry": geometry, "type": "Feature"}
-        elif self._point_geojson is not None:
-            geometry = json.loads(self._point_geojson)
-            return {"geometry": geometry, "type": "Feature"}
+        if self._geojson is not None:
+            return {"geometry": RawJSON(self._geojson), "type": "Feature"}
         return None
 
 
@@ -57,6 +98,29 @@ idx_entity_organisation_entity = Index(
 idx_entity_prefix = Index("idx_entity_prefix", EntityOrm.prefix)
 idx_entity_reference = Index("idx_entity_reference", EntityOrm.reference)
 idx_entity_typology = Index("idx_entity_typology", EntityOrm.typology)
+idx_entity_invalid_geometry = Index(
+    "idx_entity_invalid_geometry",
+    EntityOrm.entity,
+    postgresql_where=EntityOrm.geometry_is_valid.is_(False),
+)
+# entities link to others with a field in the json named after the linked
+# dataset, which is looked up by containment, e.g. json @> '{"local-plan": "1"}'
+idx_entity_json = Index(
+    "idx_entity_json",
+    EntityOrm.json,
+    postgresql_using="gin",
+    postgresql_ops={"json": "jsonb_path_ops"},
+)
+
+# event dates can be partial, such as 2022-12, so are ordered as text which
+# is the same order for ISO 8601 dates. A cast to date fails for partial dates
+# and can't be indexed as it depends on the DateStyle setting.
+entity_event_date = EntityOrm.json["event-date"].astext
+idx_entity_timetable_event_date = Index(
+    "idx_entity_timetable_event_date",
+    Grouping(entity_event_date).desc(),
+    postgresql_where=EntityOrm.dataset == "local-plan-timetable",
+)
 
 
 class OldEntityOrm(Base):
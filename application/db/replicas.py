@@ -0,0 +1,107 @@
+import logging
+import threading
+from typing import List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+logger = logging.getLogger(__name__)
+
+# seconds a replica is behind the primary, a primary or a replica that has
+# replayed everything it has received counts as not lagging
+REPLICATION_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReadReplicas:
+    """
+    The engines for each read database. Requests are given the healthy one
+    with the fewest checked out connections, taking turns when there's a tie.
+    A periodic health check takes replicas that fail or lag too far behind
+    out of rotation until they recover. If none are healthy all of them are
+    used rather than failing every request.
+    """
+
+    def __init__(self, engines: List[Engine], max_lag: Optional[float] = None):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.healthy = [True] * len(engines)
+        self._turn = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def choose(self, pools: Optional[Sequence[Pool]] = None) -> int:
+        """
+        Returns the index of the replica to use, pools can be given when
+        choosing between other engines for the same databases, e.g. async ones
+        """
+        if pools is None:
+            pools = [engine.pool for engine in self.engines]
+        with self._lock:
+            candidates = [i for i, healthy in enumerate(self.healthy) if healthy]
+            if not candidates:
+                candidates = list(range(len(pools)))
+            start = self._turn % len(candidates)
+            self._turn += 1
+        # min keeps the first of equals so ties go round robin
+        candidates = candidates[start:] + candidates[:start]
+        return min(candidates, key=lambda i: pools[i].checkedout())
+
+    def choose_engine(self) -> Engine:
+        return self.engines[self.choose()]
+
+    def check(self):
+        for i, engine in enumerate(self.engines):
+            healthy = self._is_healthy(engine)
+            if healthy != self.healthy[i]:
+                logger.warning(
+                    f"read replica {engine.url!r} is "
+                    f"{'back in' if healthy else 'out of'} rotation"
+                )
+            self.healthy[i] = healthy
+
+    def start_health_checks(self, interval: Optional[float]):
+        # nothing to choose between with a single database
+        if len(self.engines) < 2 or not interval or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run_health_checks,
+            args=(interval,),
+            name="read-replica-health",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop_health_checks(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run_health_checks(self, interval: float):
+        while not self._stop.wait(interval):
+            self.check()
+
+    def _is_healthy(self, engine: Engine) -> bool:
+        try:
+            with engine.connect() as connection:
+                lag = connection.execute(REPLICATION_LAG_SQL).scalar()
+        except Exception as e:
+            logger.warning(f"read replica {engine.url!r} health check failed: {e}")
+            return False
+        # a replica that hasn't replayed anything since it started has no
+        # replay timestamp, so there's no telling how far behind it is
+        if lag is None:
+            return False
+        return self.max_lag is None or lag <= self.max_lag
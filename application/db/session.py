@@ -1,7 +1,11 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Iterator
+from typing import AsyncIterator, Callable, Iterator, List
+import functools
 import logging
+from application.db.replicas import ReadReplicas
 from application.settings import get_settings
 from contextlib import contextmanager
 
@@ -12,10 +16,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def _create_engine():
+def _read_database_urls():
+    settings = get_settings()
+    return [settings.READ_DATABASE_URL, *settings.READ_REPLICA_DATABASE_URLS]
+
+
+def _create_engine(url):
     settings = get_settings()
     engine = create_engine(
-        settings.READ_DATABASE_URL,
+        url,
         pool_size=settings.DB_POOL_SIZE,
         max_overflow=settings.DB_POOL_MAX_OVERFLOW,
     )
@@ -28,13 +37,16 @@ def _create_engine():
     return engine
 
 
-# Create session factory
-engine = _create_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create a pool for each read database and a session factory bound per session
+read_replicas = ReadReplicas(
+    [_create_engine(url) for url in _read_database_urls()],
+    max_lag=get_settings().DB_REPLICA_MAX_LAG_SECONDS,
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 
 def get_session() -> Iterator[Session]:
-    db = SessionLocal()
+    db = SessionLocal(bind=read_replicas.choose_engine())
     try:
         yield db
     finally:
@@ -43,8 +55,65 @@ def get_session() -> Iterator[Session]:
 
 @contextmanager
 def get_context_session() -> Iterator[Session]:
-    session = SessionLocal()
+    session = SessionLocal(bind=read_replicas.choose_engine())
     try:
         yield session
     finally:
         session.close()
+
+
+def _create_async_engine(url):
+    settings = get_settings()
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    engine = create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+    )
+
+    logger.info(
+        f"Async engine created with pool_size={engine.pool.size()}, "
+        f"max_overflow={engine.pool._max_overflow} "
+    )
+
+    return engine
+
+
+# the async engines are only created when first used so the asyncpg driver
+# isn't needed by code that only uses the sync session
+@functools.lru_cache()
+def get_async_engines() -> List[AsyncEngine]:
+    return [_create_async_engine(url) for url in _read_database_urls()]
+
+
+AsyncSessionLocal = sessionmaker(
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    # uses the health of the sync pool for the same database
+    engines = get_async_engines()
+    engine = engines[read_replicas.choose([engine.pool for engine in engines])]
+    session = AsyncSessionLocal(bind=engine)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def async_query(query: Callable) -> Callable:
+    """
+    Makes an async variant of a query that takes a Session as its first
+    argument. The query runs on the AsyncSession's connection so the event
+    loop is free while it waits on postgres rather than a thread being held.
+    """
+
+    @functools.wraps(query)
+    async def run_query(session: AsyncSession, *args, **kwargs):
+        return await session.run_sync(query, *args, **kwargs)
+
+    return run_query
@@ -2,6 +2,7 @@ import logging
 import sentry_sdk
 
 from datetime import timedelta
+from typing import Optional
 
 from sqlalchemy.orm import Session
 from fastapi import FastAPI, Request, status, Depends
@@ -14,11 +15,22 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import ValidationError
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.responses import Response
 from http import HTTPStatus
 
-from application.db.session import get_session
+from application.core.http_cache import (
+    get_cache_control,
+    http_date,
+    is_data_route,
+    is_not_modified,
+    make_etag,
+)
+from application.core.models import DataVersionModel
+from application.core.utils import DigitalLandJSONResponse
+from application.data_access.digital_land_queries import get_data_version
+from application.db.session import get_context_session, get_session, read_replicas
 from application.core.templates import templates
 from application.db.models import EntityOrm
 from application.exceptions import DigitalLandValidationError
@@ -87,10 +99,21 @@ def create_app():
     add_base_routes(app)
     add_routers(app)
     add_static(app)
+    add_replica_health_checks(app)
     app = add_middleware(app)
     return app
 
 
+def add_replica_health_checks(app):
+    @app.on_event("startup")
+    def start_replica_health_checks():
+        read_replicas.start_health_checks(settings.DB_HEALTH_CHECK_SECONDS)
+
+    @app.on_event("shutdown")
+    def stop_replica_health_checks():
+        read_replicas.stop_health_checks()
+
+
 def add_base_routes(app):
     @app.get("/", response_class=HTMLResponse, include_in_schema=False)
     def home(request: Request):
@@ -115,14 +138,16 @@ def add_base_routes(app):
             logger.exception(e)
             raise e
 
+    # the geojson geometry is raw JSON, which only DigitalLandJSONResponse
+    # writes as an object rather than a string
     @app.get(
-        "/invalid-geometries", response_class=JSONResponse, include_in_schema=False
+        "/invalid-geometries",
+        response_class=DigitalLandJSONResponse,
+        include_in_schema=False,
     )
     def invalid_geometries(session: Session = Depends(get_session)):
         from application.core.models import entity_factory
         from sqlalchemy import func
-        from sqlalchemy import and_
-        from sqlalchemy import not_
 
         try:
             query_args = [
@@ -130,12 +155,8 @@ def add_base_routes(app):
                 func.ST_IsValidReason(EntityOrm.geometry).label("invalid_reason"),
             ]
             query = session.query(*query_args)
-            query = query.filter(
-                and_(
-                    EntityOrm.geometry.is_not(None),
-                    not_(func.ST_IsValid(EntityOrm.geometry)),
-                )
-            )
+            # uses the partial index on the stored validity flag
+            query = query.filter(EntityOrm.geometry_is_valid.is_(False))
             entities = query.all()
             return [
                 {
@@ -297,6 +318,38 @@ def add_middleware(app):
         allow_headers=["*"],
     )
 
+    @app.middleware("http")
+    async def add_conditional_request_headers(request: Request, call_next):
+        path = request.url.path
+        cache_control = get_cache_control(
+            path, settings.DATA_VERSION_CHECK_SECONDS or 0
+        )
+        data_version = None
+        if request.method in ("GET", "HEAD") and is_data_route(path):
+            data_version = await run_in_threadpool(_get_data_version)
+
+        validators = {}
+        if data_version is not None and data_version.version:
+            validators["ETag"] = make_etag(
+                request, data_version.version, settings.RELEASE_TAG
+            )
+            if data_version.last_updated:
+                validators["Last-Modified"] = http_date(data_version.last_updated)
+            # answered before the route does any queries or rendering
+            if is_not_modified(request, validators["ETag"]):
+                if cache_control:
+                    validators["Cache-Control"] = cache_control
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers=validators
+                )
+
+        response = await call_next(request)
+        if response.status_code == status.HTTP_200_OK:
+            response.headers.update(validators)
+            if cache_control and "cache-control" not in response.headers:
+                response.headers["Cache-Control"] = cache_control
+        return response
+
     @app.middleware("http")
     async def add_strict_transport_security_header(request: Request, call_next):
         response = await call_next(request)
@@ -332,6 +385,16 @@ def add_middleware(app):
     return app
 
 
+def _get_data_version() -> Optional[DataVersionModel]:
+    try:
+        with get_context_session() as session:
+            return get_data_version(session)
+    except Exception as e:
+        # the route can still be served, just without validators
+        logger.warning(f"unable to get data version for validators: {e}")
+        return None
+
+
 # Supress "no response returned" error when client disconnects
 # discussion and sample code found here
 # https://github.com/encode/starlette/discussions/1527
@@ -1,37 +1,59 @@
+import csv
+import io
+import json
 import logging
 
 from dataclasses import asdict
-from typing import Optional, List, Set, Dict, Union
+from typing import Iterator, Optional, List, Set, Dict, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Path
+from fastapi import APIRouter, Depends, HTTPException, Request, Path, Query
 from pydantic import Required
 from pydantic.error_wrappers import ErrorWrapper
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import (
+    HTMLResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.exceptions import RequestValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from application.core.models import GeoJSON, EntityModel
+from application.core.models import GeoJSON, EntityModel, entity_factory, to_kebab
+from application.core.cache import LRUCache
 from application.data_access.digital_land_queries import (
-    get_datasets,
-    get_local_authorities,
-    get_typologies_with_entities,
+    get_data_version_async,
     get_dataset_query,
-    get_typology_names,
 )
 from application.data_access.entity_queries import (
-    get_entity_query,
-    get_entity_search,
-    get_organisations,
-    lookup_entity_link,
-    get_linked_entities,
-    fetchEntityFromReference,
+    get_entity_export,
+    get_entity_export_fields,
+    get_entity_query_async,
+    get_entity_row,
+    get_entity_search_async,
+    lookup_entity_link_rows,
+    get_entity_rows_by_reference,
+    get_linked_entity_rows_by_dataset,
+)
+from application.data_access.reference_data import (
+    get_dataset_names,
+    get_dataset_names_async,
+    get_datasets,
+    get_datasets_async,
+    get_local_authorities_async,
+    get_organisations_async,
+    get_typologies_with_entities_async,
+    get_typology_names,
+    get_typology_names_async,
 )
-from application.data_access.dataset_queries import get_dataset_names
 
-from application.search.enum import SuffixEntity
+from application.search.enum import CountOption, SuffixEntity, SuffixExport
 from application.search.filters import QueryFilters
 from application.core.templates import templates
 from application.core.utils import (
     DigitalLandJSONResponse,
+    encode_json,
     to_snake,
     entity_attribute_sort_key,
     make_links,
@@ -40,11 +62,24 @@ from application.exceptions import (
     DatasetValueNotFound,
     TypologyValueNotFound,
 )
-from application.db.session import get_session
+from application.db.session import get_async_session, get_session
+from application.settings import get_settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
+# entity pages in each format are cached, weighed by the size of their body,
+# until the data changes
+_entity_response_cache = LRUCache(
+    max_entries=settings.ENTITY_PAGE_CACHE_SIZE,
+    max_weight=settings.ENTITY_PAGE_CACHE_MAX_BYTES,
+)
+
+# GeoJSON and HTML show geometry from the geojson so never use the WKT fields
+GEOJSON_UNUSED_FIELDS = ["geometry", "point"]
+
 
 def _get_geojson(
     data: List[EntityModel], exclude: Optional[Set] = None
@@ -52,7 +87,8 @@ def _get_geojson(
     features = []
     for entity in data:
         if entity.geojson is not None:
-            geojson = entity.geojson
+            # copied as entities can be shared through the search cache
+            geojson = entity.geojson.copy()
             exclude = set(exclude) if exclude else set()
             # always remove the geospatial fields as we're only after non-gespatial prroperties
             exclude.update(["geojson", "geometry", "point"])
@@ -81,6 +117,91 @@ def _get_entity_json(
     return entities
 
 
+def _get_exclude_fields(params: Dict) -> Optional[Set[str]]:
+    if params.get("exclude_field") is None:
+        return None
+    return set(
+        [
+            to_snake(field.strip())
+            for field in ",".join(params.get("exclude_field")).split(",")
+        ]
+    )
+
+
+def _stream_ndjson(
+    entities: Iterator[EntityModel], exclude: Optional[Set[str]] = None
+) -> Iterator[bytes]:
+    exclude = set(exclude) if exclude else set()
+    exclude.add("geojson")
+    for entity in entities:
+        e = entity.dict(exclude=exclude, by_alias=True)
+        yield encode_json(jsonable_encoder(e)) + b"\n"
+
+
+def _stream_geojson_seq(
+    entities: Iterator[EntityModel], exclude: Optional[Set[str]] = None
+) -> Iterator[bytes]:
+    # RFC 8142 text sequence of features, each starting with a record separator
+    exclude = set(exclude) if exclude else set()
+    exclude.update(["geojson", "geometry", "point"])
+    for entity in entities:
+        if entity.geojson is not None:
+            feature = entity.geojson.copy()
+            feature.properties = entity.dict(exclude=exclude, by_alias=True)
+            yield b"\x1e" + encode_json(jsonable_encoder(feature)) + b"\n"
+
+
+def _get_csv_fields(
+    json_fields: List[str], exclude: Optional[Set[str]] = None
+) -> List[str]:
+    # the entity columns followed by the json fields, in their aliased form
+    fields = [
+        field.alias
+        for name, field in EntityModel.__fields__.items()
+        if name != "geojson"
+    ]
+    fields = ["entity"] + sorted(
+        [field for field in fields if field != "entity"],
+        key=entity_attribute_sort_key,
+    )
+    fields += [to_kebab(to_snake(field)) for field in json_fields]
+    exclude = exclude or set()
+    return [field for field in dict.fromkeys(fields) if to_snake(field) not in exclude]
+
+
+def _stream_csv(
+    entities: Iterator[EntityModel], fields: List[str], chunk_size: int = 65536
+) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for entity in entities:
+        row = entity.dict(by_alias=True, exclude={"geojson"})
+        writer.writerow(
+            {
+                key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                for key, value in row.items()
+            }
+        )
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _get_count_value(data: Dict) -> Union[int, str, None]:
+    # a capped count is a lower bound so it's reported as "N+"
+    if data.get("count_type") == CountOption.capped:
+        return f"{data['count']}+"
+    return data["count"]
+
+
+def _json_response(content) -> Response:
+    # encoded as the route's response class would encode returned content
+    return DigitalLandJSONResponse(jsonable_encoder(content))
+
+
 def handle_gone_entity(
     request: Request, entity: int, extension: Optional[SuffixEntity]
 ):
@@ -105,29 +226,69 @@ def handle_moved_entity(
 
 
 def prepare_geojson(e):
-    geojson = e.geojson
+    geojson = e.geojson.copy() if e.geojson else None
     if geojson:
         properties = e.dict(exclude={"geojson", "geometry", "point"}, by_alias=True)
         geojson.properties = properties
     return geojson
 
 
-def handle_entity_response(
-    request: Request, e, extension: Optional[SuffixEntity], session: Session
-):
-    if extension is not None and extension.value == "json":
-        return e.dict(by_alias=True, exclude={"geojson"})
+def handle_entity_response(e, extension: SuffixEntity) -> Response:
+    """
+    The json or geojson response for an entity, encoded here rather than by
+    the route so it can be run in the threadpool
+    """
+    if extension.value == "json":
+        return _json_response(e.dict(by_alias=True, exclude={"geojson"}))
 
-    geojson = None
+    geojson = prepare_geojson(e)
+    if geojson:
+        return _json_response(geojson)
+    else:
+        raise HTTPException(status_code=406, detail="geojson for entity not available")
+
+
+# entity fields which are links to an entity of the dataset of the same name
+ENTITY_LINK_FIELDS = [
+    "article-4-direction",
+    "permitted-development-rights",
+    "tree-preservation-order",
+    "local-plan-boundary",
+    "local-plan",
+    "local-plan-event",
+]
+
+
+def _entity_links(e_dict: Dict) -> Dict:
+    # the link of each entity link field the entity has
+    return {
+        field: (field, e_dict[field], None)
+        for field in ENTITY_LINK_FIELDS
+        if field in e_dict
+    }
 
-    if extension is not None and extension.value == "geojson":
-        geojson = prepare_geojson(e)
-        if geojson:
-            return geojson
-        else:
-            raise HTTPException(
-                status_code=406, detail="geojson for entity not available"
-            )
+
+def fetch_entity_page_rows(session: Session, e) -> dict:
+    """
+    Runs the queries of an entity page, returning the EntityOrm it finds
+    rather than models so the session is only used for queries. The models
+    and the rest of the page are made by get_entity_page_context.
+    """
+    e_dict = e.dict(by_alias=True, exclude={"geojson"})
+    organisation_entity, _, _ = get_entity_row(session, e.organisation_entity)
+    return {
+        "datasets": get_datasets(session, datasets=e_dict.keys()),
+        "dataset": get_dataset_query(session, e.dataset),
+        "organisation_entity": organisation_entity,
+        "linked_entities": lookup_entity_link_rows(
+            session, _entity_links(e_dict).values()
+        ),
+        "local_plans": fetch_linked_local_plan_rows(session, e_dict),
+    }
+
+
+def get_entity_page_context(request: Request, e, rows: dict) -> dict:
+    geojson = None
 
     e_dict = e.dict(by_alias=True, exclude={"geojson"})
     e_dict_sorted = {
@@ -142,65 +303,51 @@ def handle_entity_response(
     #     fields = {field["field"]: field for field in fields}
 
     # get dictionary of fields which have linked datasets
-    dataset_fields = get_datasets(session, datasets=e_dict_sorted.keys())
     dataset_fields = [
-        dataset_field.dict(by_alias=True) for dataset_field in dataset_fields
+        dataset_field.dict(by_alias=True) for dataset_field in rows["datasets"]
     ]
     dataset_fields = [dataset_field["dataset"] for dataset_field in dataset_fields]
 
-    dataset = get_dataset_query(session, e.dataset)
-
-    organisation_entity, _, _ = get_entity_query(session, e.organisation_entity)
+    organisation_entity = None
+    if rows["organisation_entity"] is not None:
+        organisation_entity = entity_factory(rows["organisation_entity"])
 
-    entityLinkFields = [
-        "article-4-direction",
-        "permitted-development-rights",
-        "tree-preservation-order",
-        "local-plan-boundary",
-        "local-plan",
-        "local-plan-event",
-    ]
+    # for each entity link field the entity has, add the entity it links to
+    # to the linked_entities dict
+    found_links = rows["linked_entities"]
+    linked_entities = {
+        field: entity_factory(found_links[link]).dict(
+            by_alias=True, exclude={"geojson"}
+        )
+        for field, link in _entity_links(e_dict_sorted).items()
+        if link in found_links
+    }
 
-    linked_entities = {}
-
-    # for each entityLinkField, if that key exists in the entity dict, then
-    # lookup the entity and add it to the linked_entities dict
-    for field in entityLinkFields:
-        if field in e_dict_sorted:
-            linked_entity = lookup_entity_link(
-                session, e_dict_sorted[field], field, e_dict_sorted["dataset"]
-            )
-            if linked_entity is not None:
-                linked_entities[field] = linked_entity
-
-    # Fetch linked local plans/document/timetable
-    local_plans, local_plan_boundary_geojson = fetch_linked_local_plans(
-        session, e_dict_sorted
+    # linked local plans/document/timetable
+    local_plans, local_plan_boundary_geojson = make_linked_local_plans(
+        rows["local_plans"]
     )
 
-    return templates.TemplateResponse(
-        "entity.html",
-        {
-            "request": request,
-            "row": e_dict_sorted,
-            "local_plan_geojson": local_plan_boundary_geojson,
-            "linked_entities": linked_entities,
-            "local_plans": local_plans,
-            "entity": e,
-            "pipeline_name": e.dataset,
-            "references": [],
-            "breadcrumb": [],
-            "schema": None,
-            "typology": e.typology,
-            "entity_prefix": "",
-            "geojson_features": e.geojson if e.geojson is not None else None,
-            "geojson": geojson.dict() if geojson else None,
-            "fields": fields,
-            "dataset_fields": dataset_fields,
-            "dataset": dataset,
-            "organisation_entity": organisation_entity,
-        },
-    )
+    return {
+        "request": request,
+        "row": e_dict_sorted,
+        "local_plan_geojson": local_plan_boundary_geojson,
+        "linked_entities": linked_entities,
+        "local_plans": local_plans,
+        "entity": e,
+        "pipeline_name": e.dataset,
+        "references": [],
+        "breadcrumb": [],
+        "schema": None,
+        "typology": e.typology,
+        "entity_prefix": "",
+        "geojson_features": e.geojson if e.geojson is not None else None,
+        "geojson": geojson.dict() if geojson else None,
+        "fields": fields,
+        "dataset_fields": dataset_fields,
+        "dataset": rows["dataset"],
+        "organisation_entity": organisation_entity,
+    }
 
 
 linked_datasets = {
@@ -213,59 +360,162 @@ linked_datasets = {
 }
 
 
+def _timetable_event(entity_orm):
+    # estimated events aren't shown on the timetable
+    event = (entity_orm.json or {}).get("local-plan-event")
+    if event and not event.startswith("estimated"):
+        return event
+    return None
+
+
 def fetch_linked_local_plans(session: Session, e_dict_sorted: Dict = None):
-    results = {}
-    local_plan_boundary_geojson = None
+    """
+    Fetches the documents, timetables and boundary linked to a local plan, or
+    the plans linked to a boundary
+    """
+    return make_linked_local_plans(fetch_linked_local_plan_rows(session, e_dict_sorted))
+
+
+def fetch_linked_local_plan_rows(
+    session: Session, e_dict_sorted: Dict = None
+) -> Optional[Dict]:
+    """
+    The EntityOrm linked to a local plan or boundary, made into models by
+    make_linked_local_plans. The timetable is fetched in one query, the
+    other linked entities in another, and the boundary and timetable events
+    in a third, however long the timetable is.
+    """
     dataset = e_dict_sorted["dataset"]
     reference = e_dict_sorted["reference"]
-    if dataset in linked_datasets:
-        linked_dataset_value = linked_datasets[dataset]
-        for linked_dataset in linked_dataset_value:
-            if dataset == "local-plan" and linked_dataset == "local-plan-boundary":
-                if linked_dataset in e_dict_sorted:
-                    local_plan_boundary_geojson = fetchEntityFromReference(
-                        session, linked_dataset, e_dict_sorted[linked_dataset]
-                    )
-            linked_entities = get_linked_entities(
-                session, linked_dataset, reference, linked_dataset=dataset
-            )
-            results[linked_dataset] = linked_entities
-
-            # Handle special case for "local-plan-timetable"
-            if dataset == "local-plan" and linked_dataset == "local-plan-timetable":
-                for entity in linked_entities:
-                    if (
-                        hasattr(entity, "local_plan_event")
-                        and entity.local_plan_event
-                        and not entity.local_plan_event.startswith("estimated")
-                    ):
-                        entity.local_plan_event = fetchEntityFromReference(
-                            session, "local-plan-event", entity.local_plan_event
-                        )
-                    else:
-                        entity.local_plan_event = None
+    if dataset not in linked_datasets:
+        return None
+
+    linked_dataset_value = linked_datasets[dataset]
+    linked = get_linked_entity_rows_by_dataset(
+        session, linked_dataset_value, reference, linked_dataset=dataset
+    )
+    if dataset != "local-plan":
+        return {"linked": linked}
+
+    events = [
+        _timetable_event(entity) for entity in linked.get("local-plan-timetable", [])
+    ]
+    references = [("local-plan-event", event) for event in events if event]
+    boundary = None
+    if "local-plan-boundary" in linked_dataset_value:
+        boundary = ("local-plan-boundary", e_dict_sorted.get("local-plan-boundary"))
+        references.append(boundary)
+
+    return {
+        "linked": linked,
+        "events": events,
+        "boundary": boundary,
+        "found": get_entity_rows_by_reference(session, references),
+    }
+
+
+def make_linked_local_plans(rows: Optional[Dict]):
+    """
+    The linked entities of each dataset, with the event of each timetable
+    entry, and the boundary of a local plan
+    """
+    if rows is None:
+        return {}, None
+
+    results = {
+        dataset: [entity_factory(entity) for entity in entities]
+        for dataset, entities in rows["linked"].items()
+    }
+    if "found" not in rows:
+        return results, None
+
+    found = {pair: entity_factory(entity) for pair, entity in rows["found"].items()}
+    local_plan_boundary_geojson = None
+    if rows["boundary"] is not None:
+        local_plan_boundary_geojson = found.get(rows["boundary"])
+    for entity, event in zip(results.get("local-plan-timetable", []), rows["events"]):
+        entity.local_plan_event = found.get(("local-plan-event", event))
 
     return results, local_plan_boundary_geojson
 
 
-def get_entity(
+async def get_entity(
     request: Request,
     entity: int = Path(default=Required, description="Entity id"),
     extension: Optional[SuffixEntity] = None,
-    session: Session = Depends(get_session),
+    simplify: Optional[float] = Query(
+        None,
+        description="simplify the geometry to this tolerance in degrees, preserving topology",
+        gt=0,
+    ),
+    precision: Optional[int] = Query(
+        None,
+        description="maximum number of decimal places in geometry coordinates",
+        ge=0,
+        le=15,
+    ),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    e, old_entity_status, new_entity_id = get_entity_query(session, entity)
+    if not _entity_response_cache.enabled:
+        return await _get_entity_response(
+            request, entity, extension, simplify, precision, session
+        )
+
+    version = (await get_data_version_async(session)).version
+    key = (entity, extension.value if extension else None, simplify, precision)
+    # without a data version there's no telling when a page would be stale
+    cached = _entity_response_cache.get(key, version) if version else None
+    if cached is not None:
+        content, status_code, headers = cached
+        return Response(content, status_code=status_code, headers=headers)
+
+    response = await _get_entity_response(
+        request, entity, extension, simplify, precision, session
+    )
+    if version:
+        _entity_response_cache.set(
+            key,
+            (response.body, response.status_code, dict(response.headers)),
+            version,
+            weight=len(response.body),
+        )
+    return response
+
 
+async def _get_entity_response(
+    request: Request,
+    entity: int,
+    extension: Optional[SuffixEntity],
+    simplify: Optional[float],
+    precision: Optional[int],
+    session: AsyncSession,
+):
+    e, old_entity_status, new_entity_id = await get_entity_query_async(
+        session, entity, simplify=simplify, precision=precision
+    )
+
+    # templates are rendered and json encoded in the threadpool, as on the
+    # event loop they would hold up every other request
     if old_entity_status == 410:
-        return handle_gone_entity(request, entity, extension)
+        return await run_in_threadpool(handle_gone_entity, request, entity, extension)
     elif old_entity_status == 301:
         return handle_moved_entity(entity, new_entity_id, extension)
     elif e is not None:
-        return handle_entity_response(request, e, extension, session)
+        if extension is not None and extension.value in ("json", "geojson"):
+            return await run_in_threadpool(handle_entity_response, e, extension)
+        # the page needs several more queries so they're run together, and
+        # the models they find are made in the threadpool with the page
+        rows = await session.run_sync(fetch_entity_page_rows, e)
+        return await run_in_threadpool(_render_entity_page, request, e, rows)
     else:
         raise HTTPException(status_code=404, detail="entity not found")
 
 
+def _render_entity_page(request: Request, e, rows: dict) -> Response:
+    context = get_entity_page_context(request, e, rows)
+    return templates.TemplateResponse("entity.html", context)
+
+
 def validate_dataset(dataset: str, datasets: list):
     """
     Given a dataset and a set of datasets will check if dataset is a valid one
@@ -312,11 +562,72 @@ def validate_typologies(typologies, typology_names):
     return
 
 
-def search_entities(
+def export_entities(
     request: Request,
     query_filters: QueryFilters = Depends(),
-    extension: Optional[SuffixEntity] = None,
     session: Session = Depends(get_session),
+):
+    extension = SuffixExport(request.url.path.rsplit(".", 1)[-1])
+
+    query_params = asdict(query_filters)
+    validate_dataset(query_params.get("dataset", None), get_dataset_names(session))
+    validate_typologies(query_params.get("typology", None), get_typology_names(session))
+
+    exclude_fields = _get_exclude_fields(query_params)
+    if extension == SuffixExport.csv:
+        # the columns are needed for the header before any entities are read
+        fields = _get_csv_fields(
+            get_entity_export_fields(session, query_params), exclude=exclude_fields
+        )
+        entities = get_entity_export(session, query_params, unused_fields=["geojson"])
+        return StreamingResponse(_stream_csv(entities, fields), media_type="text/csv")
+
+    if extension == SuffixExport.geojsonseq:
+        entities = get_entity_export(
+            session, query_params, unused_fields=GEOJSON_UNUSED_FIELDS
+        )
+        return StreamingResponse(
+            _stream_geojson_seq(entities, exclude=exclude_fields),
+            media_type="application/geo+json-seq",
+        )
+    entities = get_entity_export(session, query_params, unused_fields=["geojson"])
+    return StreamingResponse(
+        _stream_ndjson(entities, exclude=exclude_fields),
+        media_type="application/x-ndjson",
+    )
+
+
+def _search_json_response(data: dict, links: dict) -> Response:
+    params = data["params"]
+    if params.get("field") is not None:
+        include = set([to_snake(field) for field in params.get("field")])
+        entities = _get_entity_json(data["entities"], include=include)
+    elif params.get("exclude_field") is not None:
+        exclude_fields = _get_exclude_fields(params)
+        entities = _get_entity_json(data["entities"], exclude=exclude_fields)
+    else:
+        entities = _get_entity_json(data["entities"])
+    return _json_response(
+        {"entities": entities, "links": links, "count": _get_count_value(data)}
+    )
+
+
+def _search_geojson_response(data: dict, links: dict) -> Response:
+    params = data["params"]
+    if params.get("exclude_field") is not None:
+        exclude_fields = _get_exclude_fields(params)
+        geojson = _get_geojson(data["entities"], exclude=exclude_fields)
+    else:
+        geojson = _get_geojson(data["entities"])
+    geojson["links"] = links
+    return _json_response(geojson)
+
+
+async def search_entities(
+    request: Request,
+    query_filters: QueryFilters = Depends(),
+    extension: Optional[SuffixEntity] = None,
+    session: AsyncSession = Depends(get_async_session),
 ):
     # Determine if the URL path includes an extension
     if "." in request.url.path:  # check if extension if in path parameter
@@ -329,16 +640,25 @@ def search_entities(
 
     # get query_filters as a dict
     query_params = asdict(query_filters)
+    if extension is None or extension.value != "json":
+        # only json responses are limited to the requested fields
+        query_params["field"] = None
     # TODO minimse queries by using normal queries below rather than returning the names
     # queries required for additional validations
-    dataset_names = get_dataset_names(session)
-    typology_names = get_typology_names(session)
+    dataset_names = await get_dataset_names_async(session)
+    typology_names = await get_typology_names_async(session)
 
     # additional validations
     validate_dataset(query_params.get("dataset", None), dataset_names)
     validate_typologies(query_params.get("typology", None), typology_names)
-    # Run entity query
-    data = get_entity_search(session, query_params)
+    # Run entity query, without loading the geometry formats that won't be shown
+    if extension is not None and extension.value == "json":
+        unused_fields = ["geojson"]
+    else:
+        unused_fields = GEOJSON_UNUSED_FIELDS
+    data = await get_entity_search_async(
+        session, query_params, unused_fields=unused_fields
+    )
     # the query does some normalisation to remove empty
     # params and they get returned from search
     params = data["params"]
@@ -346,49 +666,29 @@ def search_entities(
     netloc = request.url.netloc
     path = request.url.path
     query = request.url.query
-    links = make_links(scheme, netloc, path, query, data)
+    # API clients walking whole datasets are linked to the next page by
+    # cursor, the HTML page by offset so it can link to the previous page
+    links = make_links(scheme, netloc, path, query, data, cursor=extension is not None)
 
+    # results are rendered and encoded in the threadpool so a large page
+    # doesn't hold up the event loop
     if extension is not None and extension.value == "json":
-        if params.get("field") is not None:
-            include = set([to_snake(field) for field in params.get("field")])
-            entities = _get_entity_json(data["entities"], include=include)
-        elif params.get("exclude_field") is not None:
-            exclude_fields = set(
-                [
-                    to_snake(field.strip())
-                    for field in ",".join(params.get("exclude_field")).split(",")
-                ]
-            )
-            entities = _get_entity_json(data["entities"], exclude=exclude_fields)
-        else:
-            entities = _get_entity_json(data["entities"])
-        return {"entities": entities, "links": links, "count": data["count"]}
+        return await run_in_threadpool(_search_json_response, data, links)
 
     if extension is not None and extension.value == "geojson":
-        if params.get("exclude_field") is not None:
-            exclude_fields = set(
-                [
-                    to_snake(field.strip())
-                    for field in ",".join(params.get("exclude_field")).split(",")
-                ]
-            )
-            geojson = _get_geojson(data["entities"], exclude=exclude_fields)
-        else:
-            geojson = _get_geojson(data["entities"])
-        geojson["links"] = links
-        return geojson
+        return await run_in_threadpool(_search_geojson_response, data, links)
 
-    typologies = get_typologies_with_entities(session)
+    typologies = await get_typologies_with_entities_async(session)
     typologies = [t.dict() for t in typologies]
     # dataset facet
-    response = get_datasets(session)
+    response = await get_datasets_async(session)
     columns = ["dataset", "name", "plural", "typology", "themes", "paint_options"]
     datasets = [dataset.dict(include=set(columns)) for dataset in response]
 
-    local_authorities = get_local_authorities(session, "local-authority")
+    local_authorities = await get_local_authorities_async(session, "local-authority")
     local_authorities = [la.dict() for la in local_authorities]
 
-    organisations = get_organisations(session)
+    organisations = await get_organisations_async(session)
     columns = ["entity", "organisation_entity", "name"]
     organisations_list = [
         organisation.dict(include=set(columns)) for organisation in organisations
@@ -405,11 +705,13 @@ def search_entities(
         next_url = None
     # default is HTML
     has_geographies = any((e.typology == "geography" for e in data["entities"]))
-    return templates.TemplateResponse(
+    return await run_in_threadpool(
+        templates.TemplateResponse,
         "search.html",
         {
             "request": request,
             "count": data["count"],
+            "count_type": data.get("count_type", CountOption.exact),
             "limit": params["limit"],
             "data": data["entities"],
             "datasets": datasets,
@@ -439,6 +741,14 @@ def search_entities(
 
 
 # Route ordering in important. Match routes with extensions first
+for export_extension in SuffixExport:
+    router.add_api_route(
+        f".{export_extension.value}",
+        endpoint=export_entities,
+        response_class=StreamingResponse,
+        tags=["Search entity"],
+        summary=f"This endpoint streams every entity matching the specified parameters as {export_extension.value}, ignoring the limit and offset.",  # noqa: E501
+    )
 router.add_api_route(
     ".{extension}",
     endpoint=search_entities,
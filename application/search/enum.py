@@ -11,6 +11,12 @@ class SuffixEntity(str, Enum):
     geojson = "geojson"
 
 
+class SuffixExport(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    geojsonseq = "geojsonseq"
+
+
 class SuffixDataset(str, Enum):
     json = "json"
     html = "html"
@@ -42,6 +48,13 @@ class GeometryRelation(str, Enum):
     # dwithin = "dwithin"
 
 
+class CountOption(str, Enum):
+    exact = "exact"  # our default
+    estimate = "estimate"
+    capped = "capped"
+    none = "none"
+
+
 class PeriodOption(str, Enum):
     all = "all"
     current = "current"
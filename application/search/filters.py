@@ -11,6 +11,7 @@ from application.exceptions import (
     InvalidGeometry,
 )
 from application.search.enum import (
+    CountOption,
     PeriodOption,
     DateOption,
     GeometryRelation,
@@ -23,6 +24,7 @@ from application.search.validators import (
     validate_month_integer,
     validate_year_integer,
     validate_curies,
+    is_readable_wkt,
 )
 
 
@@ -201,6 +203,18 @@ class QueryFilters:
         10, description="limit for the number of results", ge=1, le=500
     )
     offset: Optional[int] = Query(None, description="paginate results from this entity")
+    after: Optional[int] = Query(
+        None,
+        description="paginate results from after this entity number, takes precedence over offset",
+        ge=0,
+    )
+    count: Optional[CountOption] = Query(
+        None,
+        description="""
+        How to count the matching entities, either exact (the default), estimate from the query planner,
+        capped at a maximum or none to skip counting
+        """,
+    )
 
     # response format filters
     accept: Optional[str] = Header(
@@ -217,6 +231,17 @@ class QueryFilters:
         None,
         description="field parameter will take over any fields specified in the exclude_field parameter",
     )
+    simplify: Optional[float] = Query(
+        None,
+        description="simplify geometries to this tolerance in degrees, preserving topology",
+        gt=0,
+    )
+    precision: Optional[int] = Query(
+        None,
+        description="maximum number of decimal places in geometry coordinates",
+        ge=0,
+        le=15,
+    )
 
     # validators
     _validate_entry_date_year = validator("entry_date_year", allow_reuse=True)(
@@ -259,13 +284,16 @@ class QueryFilters:
         validate_curies
     )
 
-    # TODO Replace with a solution that doesn't need a database?
     @validator("geometry", pre=True)
     def validate_geometry(cls, v: Optional[list]):
         if not v:
             return v
+        # only geometries shapely can't vouch for are checked by the database
+        unchecked = [geometry for geometry in v if not is_readable_wkt(geometry)]
+        if not unchecked:
+            return v
         with get_context_session() as session:
-            for geometry in v:
+            for geometry in unchecked:
                 try:
                     stmt = text("SELECT ST_IsValid(:geometry);")
                     stmt = stmt.bindparams(geometry=geometry)
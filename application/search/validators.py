@@ -1,6 +1,10 @@
+import math
 import re
 from typing import Optional, List
 
+import shapely
+from shapely.errors import ShapelyError
+
 from application.data_access.dataset_queries import get_dataset_names
 from application.exceptions import DatasetValueNotFound, DigitalLandValidationError
 
@@ -60,3 +64,51 @@ def validate_curies(curies: Optional[List[str]]):
                 )
             # TODO - references a bit too lax, should they be more restricted?
     return curies
+
+
+# geometry types which postgis reads from WKT the same way as GEOS
+WKT_GEOMETRY_TYPES = (
+    "Point",
+    "LineString",
+    "Polygon",
+    "MultiPoint",
+    "MultiLineString",
+    "MultiPolygon",
+    "GeometryCollection",
+)
+
+
+def _wkt_ends_with_geometry(text: str) -> bool:
+    # GEOS ignores anything after the geometry whereas postgis rejects it
+    if text.upper().endswith("EMPTY"):
+        return "(" not in text and ")" not in text
+    depth = 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i == len(text) - 1
+    return False
+
+
+def is_readable_wkt(geometry: str) -> bool:
+    """
+    Checks WKT can be read as a geometry without a database. False doesn't
+    mean it's invalid, only that it's not certain postgis would read it the
+    same way, e.g. curves or non finite coordinates, so the database has to
+    be asked.
+    """
+    try:
+        parsed = shapely.from_wkt(geometry)
+    except (ShapelyError, TypeError):
+        return False
+    text = geometry.strip()
+    return (
+        parsed is not None
+        and parsed.geom_type in WKT_GEOMETRY_TYPES
+        and parsed.is_empty == text.upper().endswith("EMPTY")
+        and _wkt_ends_with_geometry(text)
+        and all(map(math.isfinite, shapely.get_coordinates(parsed).flat))
+    )
@@ -1,6 +1,6 @@
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import List, Optional
 
 from dotenv import load_dotenv
 from pydantic import BaseSettings, PostgresDsn, HttpUrl
@@ -11,6 +11,8 @@ load_dotenv()
 class Settings(BaseSettings):
     WRITE_DATABASE_URL: PostgresDsn
     READ_DATABASE_URL: PostgresDsn
+    # further read databases, e.g. replicas, given as a JSON list
+    READ_REPLICA_DATABASE_URLS: List[PostgresDsn] = []
     SENTRY_DSN: Optional[str] = None
     SENTRY_TRACE_SAMPLE_RATE: Optional[float] = 0.01
     RELEASE_TAG: Optional[str] = None
@@ -23,6 +25,17 @@ class Settings(BaseSettings):
     OS_CLIENT_SECRET: Optional[str] = None
     DB_POOL_SIZE: Optional[int] = 5
     DB_POOL_MAX_OVERFLOW: Optional[int] = 10
+    DB_HEALTH_CHECK_SECONDS: Optional[int] = 10
+    DB_REPLICA_MAX_LAG_SECONDS: Optional[int] = 30
+    DATA_VERSION_CHECK_SECONDS: Optional[int] = 60
+    SEARCH_CACHE_SIZE: Optional[int] = 0
+    SEARCH_CACHE_MAX_BYTES: Optional[int] = 100_000_000
+    SEARCH_CACHE_TTL_SECONDS: Optional[int] = 300
+    DATASET_FIELDS_CACHE_SIZE: Optional[int] = 1000
+    SEARCH_STATEMENT_CACHE_SIZE: Optional[int] = 500
+    SEARCH_COUNT_THREADS: Optional[int] = 4
+    ENTITY_PAGE_CACHE_SIZE: Optional[int] = 0
+    ENTITY_PAGE_CACHE_MAX_BYTES: Optional[int] = 100_000_000
 
 
 @lru_cache()
@@ -0,0 +1,41 @@
+"""add json link indexes to entity
+
+Revision ID: 103306f8d96f
+Revises: c6fb59b0eb22
+Create Date: 2026-10-18 17:05:27.615204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "103306f8d96f"
+down_revision = "c6fb59b0eb22"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # jsonb_path_ops only supports containment but is smaller and faster for
+    # it than the default operator class, which is all links are looked up by
+    op.create_index(
+        "idx_entity_json",
+        "entity",
+        ["json"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"json": "jsonb_path_ops"},
+    )
+    op.create_index(
+        "idx_entity_timetable_event_date",
+        "entity",
+        [sa.text("(json ->> 'event-date') DESC")],
+        unique=False,
+        postgresql_where=sa.text("dataset = 'local-plan-timetable'"),
+    )
+
+
+def downgrade():
+    op.drop_index("idx_entity_timetable_event_date", table_name="entity")
+    op.drop_index("idx_entity_json", table_name="entity")
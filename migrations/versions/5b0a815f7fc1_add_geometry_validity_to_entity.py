@@ -0,0 +1,44 @@
+"""add geometry validity to entity
+
+Revision ID: 5b0a815f7fc1
+Revises: 4703bef121cb
+Create Date: 2026-10-18 15:40:12.481520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5b0a815f7fc1"
+down_revision = "4703bef121cb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # generated columns are worked out by postgres when rows are loaded so
+    # searches don't need to validate every candidate geometry. Both are
+    # added in one statement so the table is only rewritten once
+    op.execute(
+        sa.text(
+            "ALTER TABLE entity"
+            " ADD COLUMN geometry_is_valid BOOLEAN"
+            " GENERATED ALWAYS AS (ST_IsValid(geometry)) STORED,"
+            " ADD COLUMN point_is_valid BOOLEAN"
+            " GENERATED ALWAYS AS (ST_IsValid(point)) STORED"
+        )
+    )
+    op.create_index(
+        "idx_entity_invalid_geometry",
+        "entity",
+        ["entity"],
+        unique=False,
+        postgresql_where=sa.text("geometry_is_valid IS false"),
+    )
+
+
+def downgrade():
+    op.drop_index("idx_entity_invalid_geometry", table_name="entity")
+    op.drop_column("entity", "point_is_valid")
+    op.drop_column("entity", "geometry_is_valid")
@@ -0,0 +1,35 @@
+"""add stored geojson to entity
+
+Revision ID: c6fb59b0eb22
+Revises: 5b0a815f7fc1
+Create Date: 2026-10-18 16:20:41.093318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c6fb59b0eb22"
+down_revision = "5b0a815f7fc1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # encoded once when rows are loaded rather than on every read. Both are
+    # added in one statement so the table is only rewritten once
+    op.execute(
+        sa.text(
+            "ALTER TABLE entity"
+            " ADD COLUMN geometry_geojson TEXT"
+            " GENERATED ALWAYS AS (ST_AsGeoJSON(geometry)) STORED,"
+            " ADD COLUMN point_geojson TEXT"
+            " GENERATED ALWAYS AS (ST_AsGeoJSON(point)) STORED"
+        )
+    )
+
+
+def downgrade():
+    op.drop_column("entity", "point_geojson")
+    op.drop_column("entity", "geometry_geojson")
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Generator, Dict, List, Union
 
 import pytest
@@ -7,7 +8,10 @@ from fastapi.testclient import TestClient
 from alembic.config import Config
 from pydantic import PostgresDsn
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from sqlalchemy_utils import database_exists, create_database, drop_database
 from multiprocessing.context import Process
 import uvicorn
@@ -26,7 +30,7 @@ from application.db.models import (
     AttributionOrm,
     LicenceOrm,
 )
-from application.db.session import get_session
+from application.db.session import get_async_session, get_session
 from application.settings import Settings, get_settings
 from tests.utils.database import (
     add_base_datasets_to_database,
@@ -188,6 +192,47 @@ def test_data_old_entities(
     }
 
 
+class SyncAsyncSession:
+    """
+    Lets routes using the AsyncSession run their queries in the test
+    transaction of the sync db_session so they see the test data
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    @property
+    def sync_session(self) -> Session:
+        return self.session
+
+    @property
+    def bind(self):
+        return self.session.bind
+
+    async def execute(self, statement, params=None):
+        return self.session.execute(statement, params)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+
+@pytest.fixture(scope="function")
+def async_db_engine(create_db):
+    """
+    An engine using the asyncpg driver the async routes use, rather than the
+    sync session SyncAsyncSession stands in with, so queries are compiled
+    and bound as they are when served. Its connections don't see data added
+    with db_session, and aren't pooled as each test runs its own event loop.
+    """
+    pytest.importorskip("asyncpg")
+    engine = create_async_engine(
+        make_url(create_db).set(drivername="postgresql+asyncpg"),
+        poolclass=NullPool,
+    )
+    yield engine
+    asyncio.run(engine.dispose())
+
+
 # Creating a testclient, this can be used for API testing
 # you can get html out too but it won't test it in the browser
 # just whether a static html is produced, it works with the
@@ -208,6 +253,7 @@ def client(app: FastAPI, db_session: Session) -> TestClient:
     so separate programs e.g. a browser cannot interact with it
     """
     app.dependency_overrides[get_session] = lambda: db_session
+    app.dependency_overrides[get_async_session] = lambda: SyncAsyncSession(db_session)
     return TestClient(app)
 
 
@@ -351,8 +397,18 @@ def get_context_session_override():
     return session
 
 
+async def get_context_async_session_override():
+    engine = create_async_engine(
+        make_url(DEFAULT_TEST_DATABASE_URL).set(drivername="postgresql+asyncpg")
+    )
+    async with sessionmaker(engine, class_=AsyncSession)() as session:
+        yield session
+    await engine.dispose()
+
+
 appInstance = create_app()
 appInstance.dependency_overrides[get_session] = get_context_session_override
+appInstance.dependency_overrides[get_async_session] = get_context_async_session_override
 HOST = "0.0.0.0"
 PORT = 9000
 
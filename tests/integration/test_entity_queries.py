@@ -1,9 +1,20 @@
+import asyncio
+import json
 from datetime import datetime
 import pytest
-from application.data_access.entity_queries import get_organisations, lookup_entity_link
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from application.data_access.entity_queries import (
+    get_entity_query_async,
+    get_entity_search_async,
+    get_organisations,
+    lookup_entity_link,
+    lookup_entity_links,
+)
 from application.data_access.entity_queries import (
     _apply_period_option_filter,
     get_linked_entities,
+    get_linked_entities_by_dataset,
 )
 from application.db.models import EntityOrm
 
@@ -47,6 +58,38 @@ def test__lookup_entity_link_returns_the_looked_up_entity_when_the_link_exists(
     assert linked_entity["reference"] == lookup_entity["reference"]
 
 
+def test__lookup_entity_links_resolves_each_link(db_session):
+    for entity, dataset, reference in [
+        (107, "article-4-direction", "a-reference"),
+        (108, "tree-preservation-order", "a-reference"),
+        (109, "tree-preservation-order", "a-reference"),
+    ]:
+        db_session.add(
+            EntityOrm(
+                entity=entity,
+                dataset=dataset,
+                reference=reference,
+                organisation_entity=123 if entity != 109 else 456,
+                typology="geography",
+            )
+        )
+
+    linked_entities = lookup_entity_links(
+        db_session,
+        [
+            ("article-4-direction", "a-reference", None),
+            ("tree-preservation-order", "a-reference", None),
+            ("tree-preservation-order", "a-reference", 456),
+            ("local-plan", "a-reference", None),
+        ],
+    )
+
+    assert {link: e["entity"] for link, e in linked_entities.items()} == {
+        ("article-4-direction", "a-reference", None): 107,
+        ("tree-preservation-order", "a-reference", 456): 109,
+    }
+
+
 @pytest.mark.parametrize("period", [["current"], ["historical"], ["all"]])
 def test_apply_period_option_filter(db_session, period):
     entities = [
@@ -249,6 +292,93 @@ def test__local_plan_linked_entity_timetable_order_check(
     assert linked_entities[0].event_date == "2022-11-20"
 
 
+def test__local_plan_linked_entity_timetable_orders_partial_dates(db_session):
+    for entity, event_date in [
+        (4220003, "2021"),
+        (4220004, "2022-11-20"),
+        (4220005, "2022-03"),
+    ]:
+        db_session.add(
+            EntityOrm(
+                entity=entity,
+                dataset="local-plan-timetable",
+                json={"event-date": event_date, "local-plan": "1481207"},
+                reference=f"timetable-{entity}",
+                typology="timetable",
+            )
+        )
+
+    linked_entities = get_linked_entities(
+        db_session, "local-plan-timetable", "1481207", "local-plan"
+    )
+
+    assert [e.event_date for e in linked_entities] == ["2022-11-20", "2022-03", "2021"]
+
+
+def _add_local_plan_links(db_session):
+    for entity, dataset, event_date in [
+        (4220002, "local-plan-document", None),
+        (4220003, "local-plan-timetable", "2021"),
+        (4220004, "local-plan-timetable", "2022-11-20"),
+        (4220005, "local-plan-timetable", "2022-03"),
+    ]:
+        db_session.add(
+            EntityOrm(
+                entity=entity,
+                dataset=dataset,
+                json={"event-date": event_date, "local-plan": "1481207"},
+                reference=f"{dataset}-{entity}",
+                typology="document",
+            )
+        )
+    db_session.flush()
+
+
+def test_get_linked_entities_by_dataset_orders_timetables_by_event_date(db_session):
+    _add_local_plan_links(db_session)
+
+    linked = get_linked_entities_by_dataset(
+        db_session,
+        ["local-plan-document", "local-plan-timetable", "local-plan-boundary"],
+        "1481207",
+        "local-plan",
+    )
+
+    assert [e.entity for e in linked["local-plan-document"]] == [4220002]
+    assert [e.event_date for e in linked["local-plan-timetable"]] == [
+        "2022-11-20",
+        "2022-03",
+        "2021",
+    ]
+    assert linked["local-plan-boundary"] == []
+
+
+def test_get_linked_entities_by_dataset_timetables_can_use_event_date_index(
+    db_session,
+):
+    _add_local_plan_links(db_session)
+    statements = []
+    connection = db_session.connection()
+
+    @event.listens_for(connection, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "ORDER BY" in statement:
+            statements.append((statement, parameters))
+
+    get_linked_entities_by_dataset(
+        db_session, ["local-plan-timetable"], "1481207", "local-plan"
+    )
+    event.remove(connection, "before_cursor_execute", capture)
+
+    # with scans of the whole table ruled out, the partial index is the
+    # only way to read the timetables in order without sorting them
+    connection.execute(text("SET LOCAL enable_seqscan = off"))
+    connection.execute(text("SET LOCAL enable_bitmapscan = off"))
+    (statement, parameters), *_ = statements
+    plan = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+    assert "idx_entity_timetable_event_date" in "\n".join(row[0] for row in plan)
+
+
 @pytest.mark.parametrize(
     "organisation_entity",
     [
@@ -293,3 +423,37 @@ def test_get_organisations(db_session, organisation_entity):
         assert (
             organisations == []
         ), "Expected no organisations to be returned when name is None"
+
+
+def test_get_entity_query_and_search_async_with_async_driver(async_db_engine):
+    # the entity is added on the async connection, which doesn't see data
+    # added with db_session, and rolled back once it's been got
+    async def get_entity_and_search():
+        async with async_db_engine.connect() as connection:
+            transaction = await connection.begin()
+            session = AsyncSession(bind=connection)
+            session.add(
+                EntityOrm(
+                    entity=7010000001,
+                    dataset="tree",
+                    reference="T1",
+                    json={"tree-species": "oak"},
+                    point="SRID=4326;POINT(-0.1 51.5)",
+                )
+            )
+            await session.flush()
+            session.expunge_all()
+            entity, _, _ = await get_entity_query_async(session, 7010000001)
+            search = await get_entity_search_async(
+                session, {"dataset": ["tree"], "reference": ["T1"]}
+            )
+            await transaction.rollback()
+        return entity, search
+
+    entity, search = asyncio.run(get_entity_and_search())
+
+    assert entity.point == "POINT (-0.1 51.5)"
+    assert json.loads(entity.geojson.geometry)["type"] == "Point"
+    assert entity.tree_species == "oak"
+    assert search["count"] == 1
+    assert [e.entity for e in search["entities"]] == [7010000001]
@@ -1,6 +1,15 @@
+import asyncio
+import csv
+import io
+import json
+
 import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
 from application.core.models import EntityModel
-from application.data_access.entity_queries import get_entity_search
+from application.data_access.entity_queries import (
+    get_entity_search,
+    get_entity_search_async,
+)
 from application.search.enum import PeriodOption, GeometryRelation
 
 
@@ -384,6 +393,153 @@ def test_search_pagination_does_not_affect_count(test_data, client, exclude_midd
     assert result["count"] == len(test_data["entities"])
 
 
+def test_search_after_returns_entities_after_cursor(test_data, params, db_session):
+    params["after"] = 5
+    result = get_entity_search(db_session, params)
+    assert result["count"] == len(test_data["entities"])
+    assert [e.entity for e in result["entities"]] == sorted(
+        int(e["entity"]) for e in test_data["entities"] if int(e["entity"]) > 5
+    )
+
+
+def test_search_after_links_to_next_page_by_cursor(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity.json?limit=2&after=0")
+    response.raise_for_status()
+    result = response.json()
+    assert [e["entity"] for e in result["entities"]] == [1, 2]
+    assert result["links"]["next"].endswith("limit=2&after=2")
+
+
+def test_search_links_to_next_page_by_cursor_by_default(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity.json?limit=2")
+    response.raise_for_status()
+    result = response.json()
+    assert result["links"]["first"].endswith("/entity.json?limit=2")
+    assert result["links"]["next"].endswith("limit=2&after=2")
+
+
+def test_search_offset_links_to_next_page_by_offset(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity.json?limit=2&offset=2")
+    response.raise_for_status()
+    result = response.json()
+    assert result["links"]["next"].endswith("limit=2&offset=4")
+
+
+def test_search_page_links_to_previous_and_next_pages_by_offset(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity?limit=2&offset=2")
+    response.raise_for_status()
+    assert "Show previous 2 entities" in response.text
+    assert "offset=4" in response.text
+
+
+@pytest.mark.parametrize(
+    "count_option, expected_count",
+    [("exact", 11), ("capped", 11), ("none", "")],
+)
+def test_search_count_option(
+    count_option, expected_count, test_data, client, exclude_middleware
+):
+    response = client.get(f"/entity.json?limit=1&count={count_option}")
+    response.raise_for_status()
+    result = response.json()
+    assert result["count"] == expected_count
+    assert "next" in result["links"]
+
+
+def test_search_estimated_count_uses_planner(test_data, params, db_session):
+    params["count"] = "estimate"
+    result = get_entity_search(db_session, params)
+    assert isinstance(result["count"], int)
+    assert result["count_type"] == "estimate"
+
+
+def test_search_estimated_count_with_async_driver(params, async_db_engine):
+    # asyncpg binds parameters by position so they must be passed in order
+    params["count"] = "estimate"
+    params["dataset"] = ["greenspace", "brownfield-land"]
+    params["reference"] = "ref"
+
+    async def search():
+        async with AsyncSession(async_db_engine) as session:
+            return await get_entity_search_async(session, params)
+
+    result = asyncio.run(search())
+    assert isinstance(result["count"], int)
+    assert result["count_type"] == "estimate"
+
+
+def test_search_count_is_kept_when_offset_is_past_the_last_page(
+    test_data, params, db_session
+):
+    params["offset"] = 100
+    result = get_entity_search(db_session, params)
+    assert result["entities"] == []
+    assert result["count"] == len(test_data["entities"])
+
+
+def test_search_geojson_with_simplify_and_precision(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity.geojson?limit=100&simplify=0.001&precision=3")
+    response.raise_for_status()
+    features = response.json()["features"]
+    assert features
+
+    def coordinates(value):
+        if isinstance(value, list):
+            for item in value:
+                yield from coordinates(item)
+        else:
+            yield value
+
+    for feature in features:
+        for coordinate in coordinates(feature["geometry"]["coordinates"]):
+            assert round(coordinate, 3) == coordinate
+
+
+def test_search_export_ndjson_streams_every_entity(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity.ndjson?limit=1")
+    response.raise_for_status()
+    assert response.headers["content-type"] == "application/x-ndjson"
+    entities = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["entity"] for e in entities] == sorted(
+        int(e["entity"]) for e in test_data["entities"]
+    )
+
+
+def test_search_export_geojsonseq_streams_features(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity.geojsonseq?after=5")
+    response.raise_for_status()
+    records = [r for r in response.text.split("\x1e") if r]
+    features = [json.loads(record) for record in records]
+    assert features
+    for feature in features:
+        assert feature["type"] == "Feature"
+        assert feature["properties"]["entity"] > 5
+
+
+def test_search_export_csv_streams_every_entity(test_data, client, exclude_middleware):
+    response = client.get("/entity.csv")
+    response.raise_for_status()
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["entity"]) for row in rows] == sorted(
+        int(e["entity"]) for e in test_data["entities"]
+    )
+
+
 def test_search_filtering_does_affect_count(test_data, client, exclude_middleware):
     response = client.get("/entity.json?limit=1&dataset=greenspace")
     response.raise_for_status()
@@ -557,4 +713,16 @@ def test_search_entity_with_exclude_parameter(test_data, params, db_session):
     assert result["count"] == 2
 
 
+def test_search_geojson_with_exclude_field_keeps_features(
+    test_data, client, exclude_middleware
+):
+    response = client.get("/entity.geojson?exclude_field=geometry,point,name")
+    response.raise_for_status()
+    features = response.json()["features"]
+    assert features
+    for feature in features:
+        assert feature["geometry"]["type"] in ["MultiPolygon", "Point"]
+        assert "name" not in feature["properties"]
+
+
 # TODO test cases for contains, within
@@ -98,3 +98,16 @@ def test_search_by_dataset_and_lasso_excludes_invalid_geometry(
     result = get_entity_search(db_session, params)
     assert 0 == result["count"]
     assert 0 == len(result["entities"])
+
+
+def test_invalid_geometries_returns_geojson_geometry_as_an_object(
+    invalid_test_data, client
+):
+    response = client.get("/invalid-geometries")
+    response.raise_for_status()
+
+    invalid = response.json()
+    assert invalid
+    for entity in invalid:
+        assert entity["invalid_reason"]
+        assert entity["entity"]["geojson"]["geometry"]["type"] == "MultiPolygon"
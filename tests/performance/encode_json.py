@@ -0,0 +1,85 @@
+"""
+Times the encoding of search result pages by encode_json against the json
+module with NoneToEmptyStringEncoder, which copied the content to write None
+as an empty string, as responses were encoded before encode_json.
+
+    python -m tests.performance.encode_json --entities 500 --repeat 50
+"""
+import argparse
+import json
+import statistics
+import timeit
+
+from application.core.utils import NoneToEmptyStringEncoder, encode_json
+
+
+def _copying_encode(content) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        cls=NoneToEmptyStringEncoder,
+    ).encode("utf-8")
+
+
+def _search_page(entities: int) -> dict:
+    # entities shaped like those of /entity.json, with a geometry of a few
+    # hundred points and some json fields
+    geometry = (
+        "MULTIPOLYGON ((("
+        + ", ".join(f"-0.{i:06} 51.{i:06}" for i in range(300))
+        + ")))"
+    )
+    return {
+        "entities": [
+            {
+                "entity": 44000000 + i,
+                "name": f"Conservation area {i}",
+                "dataset": "conservation-area",
+                "typology": "geography",
+                "reference": f"CA{i:05}",
+                "prefix": "conservation-area",
+                "organisation-entity": "16",
+                "entry-date": "2022-03-23",
+                "start-date": None,
+                "end-date": None,
+                "geometry": geometry,
+                "point": "POINT (-0.33737 53.74541)",
+                "documentation-url": f"https://example.com/ca/{i}",
+                "designation-date": None,
+                "notes": ["listed", None, {"area": i * 0.25}],
+            }
+            for i in range(entities)
+        ],
+        "links": {"first": f"http://localhost/entity.json?limit={entities}"},
+        "count": 100000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compares encode_json with the copying encoder it replaced"
+    )
+    parser.add_argument("--entities", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    content = _search_page(args.entities)
+    assert encode_json(content) == _copying_encode(content)
+
+    timings = {}
+    for name, encode in [
+        ("copying encoder", _copying_encode),
+        ("encode_json", encode_json),
+    ]:
+        times = timeit.repeat(lambda: encode(content), number=1, repeat=args.repeat)
+        timings[name] = statistics.median(times) * 1000
+        print(f"{name}: median {timings[name]:.1f}ms")
+    speedup = timings["copying encoder"] / timings["encode_json"]
+    print(f"encode_json is {speedup:.1f} times as fast")
+
+
+if __name__ == "__main__":
+    main()
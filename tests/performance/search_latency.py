@@ -0,0 +1,96 @@
+"""
+Measures the latency of entity searches, as made for /entity.json, under
+concurrent load. The searches are run with their count alongside the page
+query on a session of the engine, as the routes run them, and with their
+count after the page on a single connection, and the latencies compared.
+
+Searches the READ_DATABASE_URL database, which needs entities of the
+dataset searched, without the search cache so every search is run:
+
+    SEARCH_CACHE_SIZE=0 python -m tests.performance.search_latency \\
+        --dataset conservation-area --searches 200 --concurrency 5
+
+Searches with their count alongside take two connections, so the
+concurrency is best kept within half of DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from application.data_access import entity_queries
+from application.data_access.entity_queries import get_entity_search_async
+from application.db.session import AsyncSessionLocal, get_async_engines
+from application.search.enum import CountOption
+
+
+async def _search_on_engine(engine, params: dict):
+    async with AsyncSessionLocal(bind=engine) as session:
+        await get_entity_search_async(session, params)
+
+
+async def _search_on_connection(engine, params: dict):
+    async with engine.connect() as connection:
+        async with AsyncSessionLocal(bind=connection) as session:
+            await get_entity_search_async(session, params)
+
+
+async def _measure(
+    search, engine, params: dict, searches: int, concurrency: int
+) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed_search():
+        async with semaphore:
+            start = time.perf_counter()
+            await search(engine, params)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(timed_search() for _ in range(searches)))
+    return latencies
+
+
+async def _compare(params: dict, searches: int, concurrency: int):
+    engine = get_async_engines()[0]
+    for name, search in [
+        ("count after the page", _search_on_connection),
+        ("count alongside the page", _search_on_engine),
+    ]:
+        # warms the connections and the statement cache
+        await _measure(search, engine, params, concurrency, concurrency)
+        latencies = await _measure(search, engine, params, searches, concurrency)
+        median = statistics.median(latencies) * 1000
+        p95 = statistics.quantiles(latencies, n=20)[18] * 1000
+        print(f"{name}: median {median:.1f}ms, 95th percentile {p95:.1f}ms")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compares the latency of searches counted alongside and "
+        "after their page"
+    )
+    parser.add_argument("--dataset", required=True)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument(
+        "--count", default="exact", choices=[option.value for option in CountOption]
+    )
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    if entity_queries._search_cache.enabled:
+        parser.error("the search cache must be disabled with SEARCH_CACHE_SIZE=0")
+
+    params = {
+        "dataset": [args.dataset],
+        "limit": args.limit,
+        "count": CountOption(args.count),
+    }
+    asyncio.run(_compare(params, args.searches, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
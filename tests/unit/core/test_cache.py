@@ -0,0 +1,57 @@
+from application.core.cache import LRUCache
+
+
+def test_lru_cache_disabled_when_max_entries_is_zero():
+    cache = LRUCache(max_entries=0)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+    assert not cache.enabled
+
+
+def test_lru_cache_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_evicts_until_under_max_weight():
+    cache = LRUCache(max_entries=10, max_weight=10)
+    cache.set("a", 1, weight=4)
+    cache.set("b", 2, weight=4)
+    cache.set("c", 3, weight=4)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.weight == 8
+
+
+def test_lru_cache_does_not_store_entry_heavier_than_max_weight():
+    cache = LRUCache(max_entries=10, max_weight=10)
+    cache.set("a", 1, weight=4)
+    cache.set("b", 2, weight=11)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_lru_cache_entries_expire_after_ttl(mocker):
+    monotonic = mocker.patch("application.core.cache.time.monotonic", return_value=0)
+    cache = LRUCache(max_entries=10, ttl=60)
+    cache.set("a", 1)
+    monotonic.return_value = 59
+    assert cache.get("a") == 1
+    monotonic.return_value = 61
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_cleared_when_version_changes():
+    cache = LRUCache(max_entries=10)
+    cache.set("a", 1, version="v1")
+    assert cache.get("a", version="v1") == 1
+    assert cache.get("a", version="v2") is None
+    cache.set("a", 2, version="v2")
+    assert cache.get("a", version="v2") == 2
@@ -6,7 +6,10 @@ from application.core.filters import (
     cacheBust,
     append_uri_param,
     hash_file,
+    get_entity_geometry,
 )
+from application.core.models import EntityModel
+from application.core.utils import RawJSON
 
 
 def test__remove_value_from_list_element_to_exclude():
@@ -134,3 +137,17 @@ def test_make_url_param_str_all_arguements():
     expected = "field=typology&test=test_value_1&test=test_value_2&test=test_value_3"
     result = make_url_param_str(input_param_dict, exclude_values, exclude_params)
     assert result == expected
+
+
+def test_get_entity_geometry_parses_raw_geojson():
+    entity = EntityModel(
+        entity=1,
+        name="test",
+        geojson={
+            "geometry": RawJSON('{"type":"Point","coordinates":[1,2]}'),
+            "type": "Feature",
+        },
+    )
+    result = get_entity_geometry(entity)
+    assert result["data"] == {"type": "Point", "coordinates": [1, 2]}
+    assert result["entity"] == 1
@@ -0,0 +1,73 @@
+from datetime import date
+
+from starlette.requests import Request
+
+from application.core.http_cache import (
+    get_cache_control,
+    http_date,
+    is_data_route,
+    is_not_modified,
+    make_etag,
+)
+
+
+def _request(path="/entity.json", query="", headers=None):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": query.encode(),
+            "headers": [
+                (key.lower().encode(), value.encode())
+                for key, value in (headers or {}).items()
+            ],
+        }
+    )
+
+
+def test_make_etag_ignores_parameter_order():
+    assert make_etag(_request(query="dataset=tree&limit=10"), "v1") == make_etag(
+        _request(query="limit=10&dataset=tree"), "v1"
+    )
+
+
+def test_make_etag_changes_with_request_version_and_release():
+    etag = make_etag(_request(query="dataset=tree"), "v1", "1.0")
+    assert etag.startswith('W/"')
+    assert make_etag(_request(query="dataset=park"), "v1", "1.0") != etag
+    assert make_etag(_request(path="/entity.geojson"), "v1", "1.0") != etag
+    assert make_etag(_request(query="dataset=tree"), "v2", "1.0") != etag
+    assert make_etag(_request(query="dataset=tree"), "v1", "1.1") != etag
+
+
+def test_is_not_modified_if_none_match():
+    etag = make_etag(_request(), "v1")
+    assert is_not_modified(_request(headers={"If-None-Match": etag}), etag)
+    assert is_not_modified(
+        _request(headers={"If-None-Match": f'"other", {etag[2:]}'}), etag
+    )
+    assert is_not_modified(_request(headers={"If-None-Match": "*"}), etag)
+    assert not is_not_modified(_request(headers={"If-None-Match": '"other"'}), etag)
+
+
+def test_is_not_modified_ignores_if_modified_since():
+    # a reload later on the same day has the same last updated date
+    request = _request(headers={"If-Modified-Since": http_date(date(2023, 7, 1))})
+    assert not is_not_modified(request, 'W/"etag"')
+
+
+def test_http_date():
+    assert http_date(date(2023, 7, 1)) == "Sat, 01 Jul 2023 00:00:00 GMT"
+
+
+def test_get_cache_control_per_route():
+    assert get_cache_control("/entity/1.json", 60) == (
+        "public, max-age=60, must-revalidate"
+    )
+    assert get_cache_control("/os/getToken", 60) == "no-store"
+    assert get_cache_control("/guidance", 60) == "public, max-age=600"
+    assert get_cache_control("/entityfoo", 60) is None
+    assert is_data_route("/dataset.json")
+    assert not is_data_route("/fact")
+    assert not is_data_route("/map")
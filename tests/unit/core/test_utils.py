@@ -1,4 +1,18 @@
-from application.core.utils import entity_attribute_sort_key, make_pagination_query_str
+import json
+from collections import OrderedDict
+
+import pytest
+
+from application.core.models import GeoJSON
+from application.core.utils import (
+    DigitalLandJSONResponse,
+    NoneToEmptyStringEncoder,
+    RawJSON,
+    entity_attribute_sort_key,
+    encode_json,
+    make_pagination_query_str,
+)
+from application.core import utils
 
 
 def test_entity_attribute_sort_key_only_excepts_string():
@@ -30,3 +44,112 @@ def test_make_pagination_query_str_preserves_repeated_key_params_when_adding_lim
     result = make_pagination_query_str(query_string_several_datasets, limit, offset)
 
     assert expected == result
+
+
+def test_digital_land_json_response_splices_raw_json_verbatim():
+    geometry = RawJSON('{"type":"Point","coordinates":[-0.33737, 53.74541]}')
+    feature = GeoJSON(geometry=geometry, properties={"name": None})
+    content = {"type": "FeatureCollection", "features": [feature.dict()]}
+
+    body = DigitalLandJSONResponse(content).body.decode("utf-8")
+
+    assert '"geometry":{"type":"Point","coordinates":[-0.33737, 53.74541]}' in body
+    assert json.loads(body)["features"][0] == {
+        "geometry": {"type": "Point", "coordinates": [-0.33737, 53.74541]},
+        "type": "Feature",
+        "properties": {"name": ""},
+    }
+
+
+def test_digital_land_json_response_plain_strings_are_not_raw_json():
+    body = DigitalLandJSONResponse({"geometry": '{"type":"Point"}'}).body
+    assert json.loads(body) == {"geometry": '{"type":"Point"}'}
+
+
+def _deepcopy_encode(content):
+    # how responses were encoded before encode_json did it in one pass
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        cls=NoneToEmptyStringEncoder,
+    ).encode("utf-8")
+
+
+def _entity_page(size=500):
+    return {
+        "entities": [
+            {
+                "entity": 1000000 + i,
+                "name": f"Entity “{i}”",
+                "dataset": "conservation-area",
+                "reference": f"CA{i:05}",
+                "prefix": "conservation-area",
+                "organisation-entity": "",
+                "start-date": None,
+                "end-date": None,
+                "entry-date": "2021-01-01",
+                "typology": "geography",
+                "point": "POINT (-0.33737 53.74541)",
+                "geometry": None,
+                "notes": ["a", None, {"nested": None, "area": i * 0.25}],
+                "documentation-url": None,
+            }
+            for i in range(size)
+        ],
+        "links": {"first": "http://testserver/entity.json?limit=500"},
+        "count": size,
+    }
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        None,
+        "",
+        {"a": None, "b": [None, 1, 2.5, True, False, {"c": None}]},
+        [None, [None], {"key": [None]}],
+        {"floats": [0.0, -0.0, 0.1, 1e-4, 1e-5, 9.5e15, 1e16, 1e100, -3.2e-7]},
+        {"ints": [0, -(2**63), 2**64 - 1, 2**64, -(2**63) - 1]},
+        {"text": 'quote " backslash \\ control \x01 newline \n “unicode” \u2028'},
+        {1: None, None: "none key", 2.5: "float key"},
+        {"tuple": (None, 1)},
+        OrderedDict([("ordered", None), ("list", [None])]),
+        _entity_page(5),
+    ],
+)
+def test_encode_json_is_byte_identical_to_deepcopy_encoding(content):
+    assert encode_json(content) == _deepcopy_encode(content)
+
+
+def test_encode_json_falls_back_to_json_module_when_orjson_fails():
+    # orjson can't encode content nested more than 255 levels deep
+    content = {"nested": None}
+    for _ in range(300):
+        content = {"nested": content}
+    with pytest.raises(utils.orjson.JSONEncodeError):
+        utils.orjson.dumps(content)
+
+    assert encode_json(content) == _deepcopy_encode(content)
+
+
+def test_encode_json_does_not_modify_content():
+    content = {"name": None, "items": [None]}
+    encode_json(content)
+    assert content == {"name": None, "items": [None]}
+
+
+def test_encode_json_rejects_nan():
+    with pytest.raises(ValueError):
+        encode_json({"area": float("nan")})
+
+
+def test_encode_json_encodes_500_entity_page_without_copying(mocker):
+    content = _entity_page(500)
+    expected = _deepcopy_encode(content)
+    deepcopy = mocker.patch.object(utils.copy, "deepcopy")
+
+    assert encode_json(content) == expected
+    deepcopy.assert_not_called()
@@ -1,9 +1,689 @@
-from sqlalchemy.orm import Query
-from application.data_access.entity_queries import _apply_limit_and_pagination_filters
+import asyncio
+import threading
+from collections import namedtuple
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from sqlalchemy import Text, bindparam, create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.types import NullType
+from application.core.cache import LRUCache
+from application.core.models import DataVersionModel, EntityModel, entity_factory
+from application.data_access.entity_queries import (
+    CAPPED_COUNT,
+    get_entity_query,
+    get_entity_query_async,
+    get_entity_search,
+    get_entity_search_async,
+    get_entities_by_reference,
+    get_linked_entities_by_dataset,
+    lookup_entity_links,
+    _apply_exclusion_filters,
+    _approximate_size,
+    _apply_field_projection,
+    _geometry_output_options,
+    _apply_limit_and_pagination_filters,
+    _apply_location_filters,
+    _Explain,
+    _get_count,
+    _start_search_count,
+    _get_estimated_count,
+    _SortedIds,
+    _get_search_statement,
+    _search_statement_values,
+)
 from application.db.models import EntityOrm
+from application.search.enum import CountOption
 
 
 def test__apply_limit_and_pagination_filters_with_no_filters_applied():
     query = Query(EntityOrm)
     result = _apply_limit_and_pagination_filters(query, params={"dataset": "testing"})
     assert result._limit_clause is None
+
+
+def test__apply_limit_and_pagination_filters_with_after_uses_range_not_offset():
+    query = Query(EntityOrm)
+    result = _apply_limit_and_pagination_filters(
+        query, params={"limit": 10, "after": 100, "offset": 20}
+    )
+    assert result._offset_clause is None
+    assert "entity.entity > " in str(result.statement)
+
+
+def test__get_count_none_does_not_query():
+    session = MagicMock()
+    count, count_type = _get_count(session, Query(EntityOrm), CountOption.none)
+    assert count is None
+    assert count_type == CountOption.none
+    session.query.assert_not_called()
+
+
+def test__get_count_capped_reports_cap_when_exceeded():
+    session = MagicMock()
+    session.query.return_value.select_from.return_value.scalar.return_value = (
+        CAPPED_COUNT + 1
+    )
+    count, count_type = _get_count(session, Query(EntityOrm), CountOption.capped)
+    assert count == CAPPED_COUNT
+    assert count_type == CountOption.capped
+
+
+def test__get_count_capped_is_exact_under_cap():
+    session = MagicMock()
+    session.query.return_value.select_from.return_value.scalar.return_value = 5
+    count, count_type = _get_count(session, Query(EntityOrm), CountOption.capped)
+    assert count == 5
+    assert count_type == CountOption.exact
+
+
+def test_get_entity_search_cached_until_data_version_changes(mocker):
+    mocker.patch("application.data_access.entity_queries._search_cache", LRUCache(10))
+    get_data_version = mocker.patch(
+        "application.data_access.entity_queries.get_data_version",
+        return_value=DataVersionModel(version="v1"),
+    )
+    search = mocker.patch(
+        "application.data_access.entity_queries._get_entity_search",
+        side_effect=lambda session, params, unused_fields: {
+            "params": params,
+            "count": 0,
+            "count_type": CountOption.exact,
+            "entities": [],
+        },
+    )
+    session = MagicMock()
+
+    get_entity_search(session, {"dataset": ["b", "a"], "limit": 10})
+    get_entity_search(session, {"dataset": ["a", "b", "a"], "limit": 10})
+    assert search.call_count == 1
+
+    get_entity_search(session, {"dataset": ["a"], "limit": 10})
+    assert search.call_count == 2
+
+    get_data_version.return_value = DataVersionModel(version="v2")
+    get_entity_search(session, {"dataset": ["a", "b"], "limit": 10})
+    assert search.call_count == 3
+
+
+def test_get_entity_search_cached_by_approximate_size(mocker):
+    cache = LRUCache(10, max_weight=10000)
+    mocker.patch("application.data_access.entity_queries._search_cache", cache)
+    mocker.patch(
+        "application.data_access.entity_queries.get_data_version",
+        return_value=DataVersionModel(version="v1"),
+    )
+    geometry = "MULTIPOLYGON (((" + "1 1, " * 1000 + "1 1)))"
+    mocker.patch(
+        "application.data_access.entity_queries._get_entity_search",
+        side_effect=lambda session, params, unused_fields: {
+            "params": params,
+            "count": 1,
+            "count_type": CountOption.exact,
+            "entities": [EntityModel(entity=1, geometry=geometry)],
+        },
+    )
+
+    get_entity_search(MagicMock(), {"dataset": ["a"]})
+
+    assert len(cache) == 1
+    assert cache.weight > len(geometry)
+    assert _approximate_size([EntityModel(entity=1)]) < cache.weight
+
+
+def test_get_entity_search_cache_ignores_accept(mocker):
+    mocker.patch("application.data_access.entity_queries._search_cache", LRUCache(10))
+    mocker.patch(
+        "application.data_access.entity_queries.get_data_version",
+        return_value=DataVersionModel(version="v1"),
+    )
+    search = mocker.patch(
+        "application.data_access.entity_queries._get_entity_search",
+        side_effect=lambda session, params, unused_fields: {
+            "params": params,
+            "count": 0,
+            "count_type": CountOption.exact,
+            "entities": [],
+        },
+    )
+
+    get_entity_search(MagicMock(), {"dataset": ["a"], "accept": "text/html"})
+    get_entity_search(MagicMock(), {"dataset": ["a"], "accept": "application/json"})
+    assert search.call_count == 1
+
+
+def test__get_search_statement_reused_for_same_shape(mocker):
+    mocker.patch(
+        "application.data_access.entity_queries._search_statement_cache", LRUCache(10)
+    )
+    first = {"dataset": ["a"], "limit": 10, "offset": 10}
+    second = {"dataset": ["b", "c", "d"], "limit": 100, "offset": 200}
+
+    statement = _get_search_statement(Session(), first, ["geojson"])
+
+    assert _get_search_statement(Session(), second, ["geojson"]) is statement
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert "entity.dataset IN (__[POSTCOMPILE_dataset])" in str(compiled)
+    assert compiled.construct_params(_search_statement_values(second)) == {
+        "dataset": ["b", "c", "d"],
+        "limit": 100,
+        "offset": 200,
+    }
+
+
+def test__get_search_statement_not_reused_for_other_shapes(mocker):
+    mocker.patch(
+        "application.data_access.entity_queries._search_statement_cache", LRUCache(10)
+    )
+    params = {"dataset": ["a"], "limit": 10}
+    statement = _get_search_statement(Session(), params, ["geojson"])
+
+    for other_params, unused_fields in [
+        ({"dataset": ["a"], "limit": 10, "exclude_field": ["name"]}, ["geojson"]),
+        ({"dataset": ["a"], "typology": ["geography"], "limit": 10}, ["geojson"]),
+        ({"dataset": "a", "limit": 10}, ["geojson"]),
+        (params, ["geometry", "point"]),
+    ]:
+        other = _get_search_statement(Session(), other_params, unused_fields)
+        assert other is not statement
+
+
+def test__get_search_statement_reused_for_other_geometry_output_values(mocker):
+    mocker.patch(
+        "application.data_access.entity_queries._search_statement_cache", LRUCache(10)
+    )
+    first = {"dataset": ["a"], "simplify": 0.1, "precision": 4, "accept": "text/html"}
+    second = {"dataset": ["a"], "simplify": 0.5, "precision": 6, "count": "estimate"}
+
+    statement = _get_search_statement(Session(), first, [])
+
+    assert _get_search_statement(Session(), second, []) is statement
+    compiled = statement.compile(dialect=postgresql.dialect())
+    values = compiled.construct_params(_search_statement_values(second))
+    assert values["simplify"] == 0.5
+    assert values["precision"] == 6
+
+
+def test__get_search_statement_location_searches_not_cached(mocker):
+    cache = mocker.patch(
+        "application.data_access.entity_queries._search_statement_cache", LRUCache(10)
+    )
+    params = {"geometry": ["POINT(-0.33737 53.74541)"], "limit": 10}
+    _get_search_statement(Session(), params, ["geojson"])
+    assert len(cache) == 0
+
+
+def test__apply_location_filters_uses_stored_validity_not_st_isvalid():
+    query = Query(EntityOrm)
+    params = {
+        "geometry": ["POINT(-0.33737 53.74541)"],
+        "longitude": -0.33737,
+        "latitude": 53.74541,
+    }
+    result = _apply_location_filters(MagicMock(), query, params)
+    sql = str(result.statement)
+    assert "ST_IsValid" not in sql
+    assert "entity.geometry_is_valid" in sql
+    assert "entity.point_is_valid" in sql
+
+
+def test_entity_query_reads_stored_geojson():
+    sql = str(Query(EntityOrm).statement)
+    assert "ST_AsGeoJSON" not in sql
+    assert "entity.geometry_geojson" in sql
+    assert "entity.point_geojson" in sql
+
+
+def test__apply_exclusion_filters_skips_excluded_geometry():
+    query = _apply_exclusion_filters(
+        Query(EntityOrm), {"exclude_field": ["geometry,point", "json"]}
+    )
+    sql = str(query.statement)
+    assert "ST_AsEWKB" not in sql
+    assert "entity.json" not in sql
+    assert "entity.name" in sql
+
+
+def test__apply_exclusion_filters_skips_unused_geojson():
+    query = _apply_exclusion_filters(
+        Query(EntityOrm), {}, unused_fields=["geojson", "geometry", "point"]
+    )
+    sql = str(query.statement)
+    assert "geojson" not in sql
+    assert "ST_AsEWKB" not in sql
+    assert "ST_AsGeoJSON" not in sql
+
+
+def test__geometry_output_options_none_without_simplify_or_precision():
+    assert _geometry_output_options() == []
+
+
+def test__geometry_output_options_simplify_in_sql_and_defers_geometry():
+    query = Query(EntityOrm).options(*_geometry_output_options(0.001, 4))
+    sql = str(query.statement)
+    assert "ST_SimplifyPreserveTopology(entity.geometry" in sql
+    assert "ST_AsGeoJSON(ST_SimplifyPreserveTopology" in sql
+    assert "ST_AsEWKB(entity.geometry)" not in sql
+    assert "ST_AsEWKB(entity.point)" not in sql
+    assert "geometry_geojson" not in sql
+
+
+def test_entity_factory_uses_simplified_wkt_when_geometry_not_loaded():
+    entity = EntityOrm(entity=1, name="test", dataset="test")
+    entity._geometry_wkt = "MULTIPOLYGON(((0 0,1 0,1 1,0 0)))"
+    entity._point_wkt = "POINT(0.5 0.5)"
+
+    result = entity_factory(entity)
+
+    assert result.geometry == "MULTIPOLYGON(((0 0,1 0,1 1,0 0)))"
+    assert result.point == "POINT(0.5 0.5)"
+
+
+def test__apply_field_projection_selects_only_requested_fields():
+    query = _apply_field_projection(Query(EntityOrm), {"field": ["name", "reference"]})
+    sql = str(query.statement)
+    assert "SELECT entity.entity, entity.name, entity.reference \nFROM entity" in sql
+    assert "geometry" not in sql
+    assert "entity.json" not in sql
+
+
+def test__apply_field_projection_reads_json_fields_by_key():
+    query = _apply_field_projection(
+        Query(EntityOrm), {"field": ["listed-building-grade"]}
+    )
+    sql = str(
+        query.statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "entity.json -> 'listed-building-grade'" in sql
+    assert "entity.json -> 'listed_building_grade'" in sql
+    assert "AS json" in sql
+
+
+def test__apply_field_projection_reads_geojson_from_stored_columns():
+    query = _apply_field_projection(Query(EntityOrm), {"field": ["geojson"]})
+    sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    assert "coalesce(entity.geometry_geojson, entity.point_geojson) AS geojson" in sql
+    assert "entity.json" not in sql
+
+
+def test__apply_field_projection_geojson_simplified():
+    query = _apply_field_projection(
+        Query(EntityOrm), {"field": ["geojson"], "simplify": 0.1, "precision": 4}
+    )
+    sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    assert "ST_AsGeoJSON(ST_SimplifyPreserveTopology(entity.geometry" in sql
+    assert "geometry_geojson" not in sql
+
+
+def test__apply_field_projection_json_keys_are_typed():
+    query = _apply_field_projection(
+        Query(EntityOrm), {"field": ["listed-building-grade"]}
+    )
+    compiled = query.statement.compile(dialect=postgresql.dialect())
+    keys = [
+        bind
+        for bind in compiled.binds.values()
+        if bind.value == "listed-building-grade"
+    ]
+    assert any(isinstance(bind.type, Text) for bind in keys)
+    assert not any(isinstance(bind.type, NullType) for bind in compiled.binds.values())
+
+
+def test_entity_factory_from_projected_row_with_geojson():
+    Row = namedtuple("Row", ["entity", "geojson"])
+    geometry = '{"type":"Point","coordinates":[0.5,0.5]}'
+    entity = entity_factory(Row(1, geometry))
+    assert entity.geojson.geometry == geometry
+    assert entity.geojson.type == "Feature"
+
+
+def test_entity_factory_from_projected_row():
+    Row = namedtuple("Row", ["entity", "name", "json"])
+    entity = entity_factory(Row(1, "test", {"listed-building-grade": "II"}))
+    assert entity.dict(by_alias=True, include={"entity", "listed_building_grade"}) == {
+        "entity": 1,
+        "listed-building-grade": "II",
+    }
+
+
+def test_entity_factory_shares_model_for_same_json_keys():
+    first = entity_factory(
+        EntityOrm(entity=1, json={"listed-building-grade": "II", "notes": "a"})
+    )
+    second = entity_factory(
+        EntityOrm(entity=2, json={"notes": "b", "listed-building-grade": "I"})
+    )
+
+    assert type(first) is type(second)
+    assert second.dict(by_alias=True, include={"notes", "listed_building_grade"}) == {
+        "notes": "b",
+        "listed-building-grade": "I",
+    }
+
+
+def test_get_entity_search_async_fetches_page_through_session(mocker):
+    mocker.patch("application.data_access.entity_queries._search_cache", LRUCache(10))
+    mocker.patch(
+        "application.data_access.entity_queries.get_data_version_async",
+        AsyncMock(return_value=DataVersionModel(version="v1")),
+    )
+    threads = {"count": [], "model": []}
+
+    def get_search_count(session, params, count_option):
+        threads["count"].append(threading.get_ident())
+        assert isinstance(session, Session)
+        return 1, CountOption.exact
+
+    def make_model(entity_orm):
+        threads["model"].append(threading.get_ident())
+        return entity_factory(entity_orm)
+
+    mocker.patch(
+        "application.data_access.entity_queries._get_search_count",
+        side_effect=get_search_count,
+    )
+    mocker.patch(
+        "application.data_access.entity_queries.entity_factory",
+        side_effect=make_model,
+    )
+    session = AsyncSession()
+    page = MagicMock()
+    page.all.return_value = [(EntityOrm(entity=1, dataset="tree"),)]
+    session.execute = AsyncMock(return_value=page)
+
+    for _ in range(2):
+        result = asyncio.run(
+            get_entity_search_async(session, {"dataset": ["tree"]}, ["point"])
+        )
+
+    assert [entity.entity for entity in result["entities"]] == [1]
+    assert result["count"] == 1
+    # the second search is cached
+    session.execute.assert_awaited_once()
+    (statement, values), _ = session.execute.call_args
+    assert "ST_AsEWKB(entity.point)" not in str(statement)
+    assert values == {"dataset": ["tree"]}
+    assert threads["count"] == [threading.get_ident()]
+    assert threads["model"] and threading.get_ident() not in threads["model"]
+
+
+def test_get_entity_search_async_counts_alongside_the_page(mocker):
+    session = AsyncSession(bind=create_async_engine("postgresql+asyncpg://"))
+    page = MagicMock()
+    page.all.return_value = []
+
+    async def search():
+        counted = asyncio.Event()
+
+        async def execute(statement, values):
+            # only returns once the count has started
+            await asyncio.wait_for(counted.wait(), timeout=1)
+            return page
+
+        async def get_search_count(engine, params, count_option):
+            assert engine is session.bind
+            counted.set()
+            return 3, CountOption.exact
+
+        session.execute = execute
+        mocker.patch(
+            "application.data_access.entity_queries._get_search_count_async",
+            side_effect=get_search_count,
+        )
+        return await get_entity_search_async(session, {"dataset": ["tree"]})
+
+    result = asyncio.run(search())
+
+    assert result["count"] == 3
+    assert result["entities"] == []
+
+
+def test_get_entity_query_async_makes_model_off_the_event_loop(mocker):
+    threads = {}
+
+    def get_entity_row(session, id, simplify, precision):
+        threads["fetch"] = threading.get_ident()
+        assert isinstance(session, Session)
+        return EntityOrm(entity=id, dataset="tree"), None, None
+
+    def make_model(entity_orm):
+        threads["model"] = threading.get_ident()
+        return entity_factory(entity_orm)
+
+    mocker.patch(
+        "application.data_access.entity_queries.get_entity_row",
+        side_effect=get_entity_row,
+    )
+    mocker.patch(
+        "application.data_access.entity_queries.entity_factory",
+        side_effect=make_model,
+    )
+
+    entity, status, new_entity_id = asyncio.run(
+        get_entity_query_async(AsyncSession(), 11000000)
+    )
+
+    assert entity.entity == 11000000
+    assert (status, new_entity_id) == (None, None)
+    assert threads["fetch"] == threading.get_ident()
+    assert threads["model"] != threading.get_ident()
+
+
+def test_lookup_entity_links_resolves_links_in_one_query():
+    session = MagicMock()
+    query = session.query.return_value.filter.return_value.options.return_value
+    query.__iter__.return_value = iter(
+        [
+            EntityOrm(entity=1, dataset="tree", reference="T1", organisation_entity=10),
+            EntityOrm(entity=2, dataset="tree", reference="T2", organisation_entity=10),
+            EntityOrm(entity=3, dataset="tree", reference="T2", organisation_entity=20),
+        ]
+    )
+
+    links = lookup_entity_links(
+        session,
+        [
+            ("tree", "T1", None),
+            ("tree", "T2", None),
+            ("tree", "T2", 20),
+            ("tree", "T3", None),
+            ("tree", "", None),
+            ("tree", ["T1"], None),
+        ],
+    )
+
+    assert session.query.call_count == 1
+    assert links.keys() == {("tree", "T1", None), ("tree", "T2", 20)}
+    assert links[("tree", "T1", None)]["entity"] == 1
+    assert links[("tree", "T2", 20)]["entity"] == 3
+
+
+def test_lookup_entity_links_without_links_does_not_query():
+    session = MagicMock()
+    assert lookup_entity_links(session, [("tree", None, None)]) == {}
+    session.query.assert_not_called()
+
+
+def test_get_linked_entities_by_dataset_queries_timetables_on_their_own():
+    others = MagicMock()
+    others.filter.return_value.filter.return_value.__iter__.return_value = iter(
+        [EntityOrm(entity=2, dataset="local-plan-document", reference="D1")]
+    )
+    timetables = MagicMock()
+    query = timetables.filter.return_value.filter.return_value
+    query.order_by.return_value.__iter__.return_value = iter(
+        [
+            EntityOrm(entity=3, dataset="local-plan-timetable", reference="T2"),
+            EntityOrm(entity=1, dataset="local-plan-timetable", reference="T1"),
+        ]
+    )
+    session = MagicMock()
+    session.query.side_effect = [others, timetables]
+
+    linked = get_linked_entities_by_dataset(
+        session,
+        ["local-plan-document", "local-plan-timetable", "local-plan-boundary"],
+        "1481207",
+        "local-plan",
+    )
+
+    assert session.query.call_count == 2
+    assert {dataset: [e.entity for e in es] for dataset, es in linked.items()} == {
+        "local-plan-document": [2],
+        "local-plan-timetable": [3, 1],
+        "local-plan-boundary": [],
+    }
+    # only the timetable query is filtered by the dataset of the partial index
+    (timetable_filter,), _ = timetables.filter.call_args
+    sql = str(
+        timetable_filter.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert sql == "entity.dataset = 'local-plan-timetable'"
+    query.order_by.assert_called_once()
+    others.filter.return_value.filter.return_value.order_by.assert_not_called()
+
+
+def test_get_entities_by_reference_leaves_out_ambiguous_references():
+    session = MagicMock()
+    session.query.return_value.filter.return_value.__iter__.return_value = iter(
+        [
+            EntityOrm(entity=1, dataset="local-plan-event", reference="published"),
+            EntityOrm(entity=2, dataset="local-plan-event", reference="adopted"),
+            EntityOrm(entity=3, dataset="local-plan-event", reference="adopted"),
+        ]
+    )
+
+    found = get_entities_by_reference(
+        session,
+        [
+            ("local-plan-event", "published"),
+            ("local-plan-event", "adopted"),
+            ("local-plan-boundary", None),
+        ],
+    )
+
+    assert session.query.call_count == 1
+    assert {pair: e.entity for pair, e in found.items()} == {
+        ("local-plan-event", "published"): 1
+    }
+
+
+def test_sorted_ids_contains():
+    ids = _SortedIds([30, 10, 20])
+    assert len(ids) == 3
+    assert 10 in ids
+    assert 30 in ids
+    assert 15 not in ids
+    assert 40 not in ids
+
+
+@pytest.fixture
+def old_entity_ids(mocker):
+    mocker.patch(
+        "application.data_access.entity_queries._old_entity_ids_cache", LRUCache(1)
+    )
+    return mocker.patch(
+        "application.data_access.entity_queries.get_data_version",
+        return_value=DataVersionModel(version="v1"),
+    )
+
+
+def _entity_query_session(old_entity_ids, row=None):
+    session = MagicMock()
+    old_entity_query = MagicMock()
+    old_entity_query.__iter__.return_value = iter([(id,) for id in old_entity_ids])
+    entity_query = MagicMock()
+    entity_query.options.return_value.get.return_value = EntityOrm(
+        entity=11000000, dataset="ancient-woodland"
+    )
+    combined = entity_query.select_from.return_value.outerjoin.return_value
+    combined.outerjoin.return_value.options.return_value.one.return_value = row
+    session.query.side_effect = lambda *entities: (
+        old_entity_query
+        if len(entities) == 1 and entities[0] is not EntityOrm
+        else entity_query
+    )
+    return session, entity_query
+
+
+def test_get_entity_query_gets_entity_not_in_old_entity_index(old_entity_ids):
+    session, entity_query = _entity_query_session([11000001])
+
+    entity, status, new_entity_id = get_entity_query(session, "11000000")
+
+    assert entity.entity == 11000000
+    assert (status, new_entity_id) == (None, None)
+    entity_query.options.return_value.get.assert_called_once_with(11000000)
+    entity_query.select_from.assert_not_called()
+
+
+def test_get_entity_query_looks_up_old_entity_in_index(old_entity_ids):
+    session, entity_query = _entity_query_session(
+        [11000001], row=(None, 301, 11000000, True)
+    )
+
+    assert get_entity_query(session, 11000001) == (None, 301, 11000000)
+    entity_query.options.return_value.get.assert_not_called()
+
+
+def test_get_entity_query_without_data_version_uses_single_query(old_entity_ids):
+    old_entity_ids.return_value = DataVersionModel()
+    session, entity_query = _entity_query_session(
+        [], row=(EntityOrm(entity=11000000), None, None, False)
+    )
+
+    entity, status, new_entity_id = get_entity_query(session, 11000000)
+
+    assert entity.entity == 11000000
+    assert (status, new_entity_id) == (None, None)
+    entity_query.options.return_value.get.assert_not_called()
+    entity_query.select_from.assert_called_once()
+
+
+def test_get_entity_query_without_id():
+    assert get_entity_query(MagicMock(), None) == (None, None, None)
+
+
+def test__get_estimated_count_executes_explain_with_bound_parameters():
+    query = Query(EntityOrm).filter(
+        EntityOrm.dataset.in_(bindparam("dataset", ["a", "b"], expanding=True))
+    )
+    session = MagicMock()
+    session.execute.return_value.scalar.return_value = '[{"Plan": {"Plan Rows": 42}}]'
+
+    assert _get_estimated_count(session, query) == 42
+
+    (explain,), _ = session.execute.call_args
+    assert isinstance(explain, _Explain)
+    compiled = explain.compile(dialect=postgresql.dialect())
+    assert str(compiled).startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert compiled.params == {"dataset": ["a", "b"]}
+
+
+def test__start_search_count_runs_on_its_own_connection(mocker):
+    engine = create_engine("sqlite://")
+    get_search_count = mocker.patch(
+        "application.data_access.entity_queries._get_search_count",
+        return_value=(3, CountOption.exact),
+    )
+
+    pending = _start_search_count(Session(bind=engine), {}, CountOption.exact)
+
+    assert pending.result() == (3, CountOption.exact)
+    (count_session, _, _), _ = get_search_count.call_args
+    assert count_session.get_bind() is engine
+
+
+def test__start_search_count_not_started_for_single_connection_or_no_count():
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        session = Session(bind=connection)
+        assert _start_search_count(session, {}, CountOption.exact) is None
+    assert _start_search_count(Session(bind=engine), {}, CountOption.none) is None
@@ -0,0 +1,79 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from application.core.models import DataVersionModel, DatasetModel
+from application.data_access import reference_data
+from application.data_access.reference_data import ReferenceDataSnapshot
+
+
+@pytest.fixture
+def data_version(mocker):
+    return mocker.patch(
+        "application.data_access.digital_land_queries.get_data_version",
+        return_value=DataVersionModel(version="v1"),
+    )
+
+
+def test_reference_data_snapshot_reads_once_per_version(data_version):
+    snapshot = ReferenceDataSnapshot()
+    loader = MagicMock(return_value=["ancient-woodland"])
+
+    assert snapshot.get(MagicMock(), "dataset_names", loader) == ["ancient-woodland"]
+    assert snapshot.get(MagicMock(), "dataset_names", loader) == ["ancient-woodland"]
+    assert loader.call_count == 1
+
+
+def test_reference_data_snapshot_reads_each_time_without_version(data_version):
+    data_version.return_value = DataVersionModel()
+    snapshot = ReferenceDataSnapshot()
+    loader = MagicMock(return_value=["ancient-woodland"])
+
+    snapshot.get(MagicMock(), "dataset_names", loader)
+    snapshot.get(MagicMock(), "dataset_names", loader)
+    assert loader.call_count == 2
+
+
+def test_reference_data_snapshot_refreshes_new_version_in_background(
+    mocker, data_version
+):
+    threads = []
+    mocker.patch(
+        "application.data_access.reference_data.threading.Thread",
+        side_effect=lambda **kwargs: threads.append(kwargs) or MagicMock(),
+    )
+    mocker.patch("application.data_access.reference_data.get_context_session")
+    snapshot = ReferenceDataSnapshot()
+    loader = MagicMock(return_value=["ancient-woodland"])
+    snapshot.get(MagicMock(), "dataset_names", loader)
+
+    data_version.return_value = DataVersionModel(version="v2")
+    loader.return_value = ["ancient-woodland", "tree"]
+
+    # the held value is served until the refresh has run
+    assert snapshot.get(MagicMock(), "dataset_names", loader) == ["ancient-woodland"]
+    assert snapshot.get(MagicMock(), "dataset_names", loader) == ["ancient-woodland"]
+    assert len(threads) == 1
+
+    threads[0]["target"](*threads[0]["args"])
+    assert snapshot.get(MagicMock(), "dataset_names", loader) == [
+        "ancient-woodland",
+        "tree",
+    ]
+
+
+def test_get_datasets_filters_snapshot_in_memory(mocker, data_version):
+    mocker.patch.object(reference_data, "_snapshot", ReferenceDataSnapshot())
+    datasets = [
+        DatasetModel(dataset=dataset, name=dataset, typology="geography")
+        for dataset in ["ancient-woodland", "conservation-area", "tree"]
+    ]
+    get_datasets = mocker.patch(
+        "application.data_access.digital_land_queries.get_datasets",
+        return_value=datasets,
+    )
+
+    found = reference_data.get_datasets(MagicMock(), datasets={"tree", "name"})
+    assert [dataset.dataset for dataset in found] == ["tree"]
+    assert len(reference_data.get_datasets(MagicMock())) == 3
+    assert get_datasets.call_count == 1
@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock
+
+from application.db.replicas import ReadReplicas
+
+
+def _engine(checked_out=0, lag=0.0, fails=False):
+    engine = MagicMock()
+    engine.pool.checkedout.return_value = checked_out
+    connection = engine.connect.return_value.__enter__.return_value
+    if fails:
+        engine.connect.side_effect = ConnectionError("connection refused")
+    connection.execute.return_value.scalar.return_value = lag
+    return engine
+
+
+def test_read_replicas_round_robin_when_connections_are_equal():
+    replicas = ReadReplicas([_engine(), _engine(), _engine()])
+    assert [replicas.choose() for _ in range(4)] == [0, 1, 2, 0]
+
+
+def test_read_replicas_chooses_fewest_checked_out_connections():
+    replicas = ReadReplicas([_engine(3), _engine(1), _engine(2)])
+    assert [replicas.choose() for _ in range(3)] == [1, 1, 1]
+
+
+def test_read_replicas_check_takes_failed_and_lagging_replicas_out_of_rotation():
+    engines = [_engine(), _engine(fails=True), _engine(lag=120.0)]
+    replicas = ReadReplicas(engines, max_lag=30)
+
+    replicas.check()
+
+    assert replicas.healthy == [True, False, False]
+    assert {replicas.choose() for _ in range(3)} == {0}
+
+
+def test_read_replicas_check_takes_replica_without_replay_lag_out_of_rotation():
+    # the lag is NULL until a replica has replayed a transaction
+    engines = [_engine(), _engine(lag=None)]
+    replicas = ReadReplicas(engines, max_lag=30)
+
+    replicas.check()
+
+    assert replicas.healthy == [True, False]
+
+
+def test_read_replicas_check_puts_recovered_replica_back_in_rotation():
+    engines = [_engine(), _engine(fails=True)]
+    replicas = ReadReplicas(engines)
+    replicas.check()
+    engines[1].connect.side_effect = None
+
+    replicas.check()
+
+    assert replicas.healthy == [True, True]
+
+
+def test_read_replicas_uses_all_when_none_are_healthy():
+    replicas = ReadReplicas([_engine(fails=True), _engine(fails=True)])
+    replicas.check()
+    assert [replicas.choose() for _ in range(2)] == [0, 1]
+
+
+def test_read_replicas_choose_between_other_pools_for_same_databases():
+    replicas = ReadReplicas([_engine(), _engine()])
+    async_pools = [MagicMock(), MagicMock()]
+    async_pools[0].checkedout.return_value = 5
+    async_pools[1].checkedout.return_value = 0
+    assert replicas.choose(async_pools) == 1
+
+
+def test_read_replicas_no_health_checks_for_single_database():
+    replicas = ReadReplicas([_engine()])
+    replicas.start_health_checks(10)
+    assert replicas._thread is None
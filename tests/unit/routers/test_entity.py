@@ -1,30 +1,66 @@
+import asyncio
+import csv
+import io
+import json
 import logging
+import threading
 import pytest
 from application.data_access.entity_query_helpers import normalised_params
 from dataclasses import asdict
 
 from application.routers.entity import (
+    _get_csv_fields,
     _get_entity_json,
     _get_geojson,
+    _stream_csv,
+    _stream_geojson_seq,
+    _stream_ndjson,
+    export_entities,
     get_entity,
     search_entities,
 )
 
 from fastapi.exceptions import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from unittest.mock import MagicMock
 
 from application.core.models import (
+    DataVersionModel,
     EntityModel,
+    entity_factory,
     DatasetModel,
     GeoJSON,
     OrganisationModel,
     TypologyModel,
 )
+from application.core.cache import LRUCache
+from application.db.models import EntityOrm
+from application.search.enum import CountOption
 from application.search.filters import QueryFilters
 
 
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+
+class AsyncSessionStub:
+    """
+    Stands in for the AsyncSession, running anything given to run_sync
+    with a mock sync session
+    """
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(MagicMock(), *args, **kwargs)
+
+
+@pytest.fixture
+def organisation_row():
+    return EntityOrm(
+        entity=600001,
+        name="Test organisation",
+        dataset="local-authority",
+        reference="TST",
+    )
 
 
 @pytest.fixture
@@ -180,7 +216,8 @@ def test_get_entity_json_with_multiple_exclude_fields(multiple_entity_models):
 
 def test_get_entity_no_entity_returned_html(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, None, None)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, None, None),
     )
     mocker.patch(
         "application.routers.entity.get_dataset_names",
@@ -188,10 +225,12 @@ def test_get_entity_no_entity_returned_html(mocker):
     )
     request = MagicMock()
     try:
-        get_entity(
-            request=request,
-            entity="11000000",
-            extension=None,
+        asyncio.run(
+            get_entity(
+                request=request,
+                entity="11000000",
+                extension=None,
+            )
         )
         assert False, "Expected HTTPException to be raised"
     except HTTPException:
@@ -200,16 +239,19 @@ def test_get_entity_no_entity_returned_html(mocker):
 
 def test_get_entity_no_entity_returned_json(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, None, None)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, None, None),
     )
     request = MagicMock()
     extension = MagicMock()
     extension.value = "json"
     try:
-        get_entity(
-            request=request,
-            entity="11000000",
-            extension=extension,
+        asyncio.run(
+            get_entity(
+                request=request,
+                entity="11000000",
+                extension=extension,
+            )
         )
         assert False, "Expected HTTPException to be raised"
     except HTTPException:
@@ -218,16 +260,19 @@ def test_get_entity_no_entity_returned_json(mocker):
 
 def test_get_entity_no_entity_returned_geojson(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, None, None)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, None, None),
     )
     request = MagicMock()
     extension = MagicMock()
     extension.value = "geojson"
     try:
-        get_entity(
-            request=request,
-            entity="11000000",
-            extension=extension,
+        asyncio.run(
+            get_entity(
+                request=request,
+                entity="11000000",
+                extension=extension,
+            )
         )
         assert False, "Expected HTTPException to be raised"
     except HTTPException:
@@ -236,10 +281,17 @@ def test_get_entity_no_entity_returned_geojson(mocker):
 
 def test_get_entity_old_entity_gone_returned_html(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, 410, None)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, 410, None),
     )
     request = MagicMock()
-    result = get_entity(request=request, entity="11000000", extension=None)
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="11000000",
+            extension=None,
+        )
+    )
     try:
         result.template.render(result.context)
         assert True
@@ -253,13 +305,20 @@ def test_get_entity_old_entity_gone_returned_html(mocker):
 
 def test_get_entity_old_entity_gone_returned_json(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, 410, None)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, 410, None),
     )
     request = MagicMock()
     extension = MagicMock()
     extension.value = "json"
     try:
-        get_entity(request=request, entity="11000000", extension=extension)
+        asyncio.run(
+            get_entity(
+                request=request,
+                entity="11000000",
+                extension=extension,
+            )
+        )
         assert False, "Expected HTTPException to be raised"
     except HTTPException:
         assert True
@@ -267,13 +326,20 @@ def test_get_entity_old_entity_gone_returned_json(mocker):
 
 def test_get_entity_old_entity_gone_returned_geojson(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, 410, None)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, 410, None),
     )
     request = MagicMock()
     extension = MagicMock()
     extension.value = "geojson"
     try:
-        get_entity(request=request, entity="11000000", extension=extension)
+        asyncio.run(
+            get_entity(
+                request=request,
+                entity="11000000",
+                extension=extension,
+            )
+        )
         assert False, "Expected HTTPException to be raised"
     except HTTPException:
         assert True
@@ -281,10 +347,17 @@ def test_get_entity_old_entity_gone_returned_geojson(mocker):
 
 def test_get_entity_old_entity_redirect_returned_html(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, 301, 1100000)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, 301, 1100000),
     )
     request = MagicMock()
-    result = get_entity(request=request, entity="11000000", extension=None)
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="11000000",
+            extension=None,
+        )
+    )
     assert isinstance(
         result, RedirectResponse
     ), f"expected a redirect response not {type(result)}"
@@ -292,12 +365,19 @@ def test_get_entity_old_entity_redirect_returned_html(mocker):
 
 def test_get_entity_old_entity_redirect_returned_json(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, 301, 1100000)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, 301, 1100000),
     )
     request = MagicMock()
     extension = MagicMock()
     extension.value = "json"
-    result = get_entity(request=request, entity="11000000", extension=extension)
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="11000000",
+            extension=extension,
+        )
+    )
     assert isinstance(
         result, RedirectResponse
     ), f"expected a redirect response not {type(result)}"
@@ -305,12 +385,19 @@ def test_get_entity_old_entity_redirect_returned_json(mocker):
 
 def test_get_entity_old_entity_redirect_returned_geojson(mocker):
     mocker.patch(
-        "application.routers.entity.get_entity_query", return_value=(None, 301, 1100000)
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, 301, 1100000),
     )
     request = MagicMock()
     extension = MagicMock()
     extension.value = "geojson"
-    result = get_entity(request=request, entity="11000000", extension=extension)
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="11000000",
+            extension=extension,
+        )
+    )
     assert isinstance(
         result, RedirectResponse
     ), f"expected a redirect response not {type(result)}"
@@ -433,12 +520,20 @@ def local_plan_dataset_model():
 
 
 def test_get_entity_entity_returned_html(
-    mocker, single_entity_model, multiple_dataset_models, ancient_woodland_dataset
+    mocker,
+    organisation_row,
+    single_entity_model,
+    multiple_dataset_models,
+    ancient_woodland_dataset,
 ):
     mocker.patch(
-        "application.routers.entity.get_entity_query",
+        "application.routers.entity.get_entity_query_async",
         return_value=(single_entity_model, None, None),
     )
+    mocker.patch(
+        "application.routers.entity.get_entity_row",
+        return_value=(organisation_row, None, None),
+    )
     mocker.patch(
         "application.routers.entity.get_datasets", return_value=multiple_dataset_models
     )
@@ -448,7 +543,14 @@ def test_get_entity_entity_returned_html(
     )
 
     request = MagicMock()
-    result = get_entity(request=request, entity="11000000", extension=None)
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="11000000",
+            extension=None,
+            session=AsyncSessionStub(),
+        )
+    )
 
     assert (
         result.status_code == 200
@@ -468,7 +570,7 @@ def test_get_entity_entity_returned_json(
     mocker, single_entity_model, multiple_dataset_models, ancient_woodland_dataset
 ):
     mocker.patch(
-        "application.routers.entity.get_entity_query",
+        "application.routers.entity.get_entity_query_async",
         return_value=(single_entity_model, None, None),
     )
     mocker.patch(
@@ -481,7 +583,16 @@ def test_get_entity_entity_returned_json(
     request = MagicMock()
     extension = MagicMock()
     extension.value = "json"
-    result = get_entity(request=request, entity="11000000", extension=extension)
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="11000000",
+            extension=extension,
+            session=AsyncSessionStub(),
+        )
+    )
+    # encoded in the threadpool rather than by the route
+    result = json.loads(result.body)
 
     assert isinstance(
         result, dict
@@ -493,7 +604,7 @@ def test_get_entity_entity_returned_geojson(
     mocker, single_entity_model, multiple_dataset_models, ancient_woodland_dataset
 ):
     mocker.patch(
-        "application.routers.entity.get_entity_query",
+        "application.routers.entity.get_entity_query_async",
         return_value=(single_entity_model, None, None),
     )
     mocker.patch(
@@ -506,8 +617,84 @@ def test_get_entity_entity_returned_geojson(
     request = MagicMock()
     extension = MagicMock()
     extension.value = "geojson"
-    result = get_entity(request=request, entity="11000000", extension=extension)
-    assert isinstance(result, GeoJSON), f"{type(result)} is expected to be a GeoJSON"
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="11000000",
+            extension=extension,
+            session=AsyncSessionStub(),
+        )
+    )
+    # encoded in the threadpool rather than by the route
+    assert result.headers["content-type"] == "application/json"
+    assert json.loads(result.body)["type"] == "Feature"
+
+
+@pytest.fixture
+def entity_response_cache(mocker):
+    cache = LRUCache(max_entries=10, max_weight=1000000)
+    mocker.patch("application.routers.entity._entity_response_cache", cache)
+    return mocker.patch(
+        "application.routers.entity.get_data_version_async",
+        return_value=DataVersionModel(version="v1"),
+    )
+
+
+def test_get_entity_cached_until_the_data_version_changes(
+    mocker, entity_response_cache, single_entity_model
+):
+    get_entity_query_async = mocker.patch(
+        "application.routers.entity.get_entity_query_async",
+        return_value=(single_entity_model, None, None),
+    )
+    extension = MagicMock()
+    extension.value = "json"
+
+    def get():
+        return asyncio.run(
+            get_entity(
+                request=MagicMock(),
+                entity=11000000,
+                extension=extension,
+                simplify=None,
+                precision=None,
+                session=AsyncSessionStub(),
+            )
+        )
+
+    first, second = get(), get()
+    assert get_entity_query_async.call_count == 1
+    assert second.body == first.body
+    assert second.headers["content-type"] == "application/json"
+    assert json.loads(second.body)["entity"] == 11000000
+
+    entity_response_cache.return_value = DataVersionModel(version="v2")
+    get()
+    assert get_entity_query_async.call_count == 2
+
+
+def test_get_entity_not_cached_without_data_version(
+    mocker, entity_response_cache, single_entity_model
+):
+    entity_response_cache.return_value = DataVersionModel()
+    get_entity_query_async = mocker.patch(
+        "application.routers.entity.get_entity_query_async",
+        return_value=(None, 301, 11000001),
+    )
+
+    for _ in range(2):
+        result = asyncio.run(
+            get_entity(
+                request=MagicMock(),
+                entity=11000000,
+                extension=None,
+                simplify=None,
+                precision=None,
+                session=AsyncSessionStub(),
+            )
+        )
+        assert result.status_code == 301
+    assert get_entity_query_async.call_count == 2
 
 
 # @pytest.fixture
@@ -592,36 +779,41 @@ def test_search_entities_no_entities_returned_no_query_params_html(
 ):
     normalised_query_params = normalised_params(asdict(QueryFilters()))
     mocker.patch(
-        "application.routers.entity.get_entity_search",
+        "application.routers.entity.get_entity_search_async",
         return_value={"params": normalised_query_params, "count": 0, "entities": []},
     )
     mocker.patch(
-        "application.routers.entity.get_datasets", return_value=multiple_dataset_models
+        "application.routers.entity.get_datasets_async",
+        return_value=multiple_dataset_models,
     )
     mocker.patch(
-        "application.routers.entity.get_typologies_with_entities",
+        "application.routers.entity.get_typologies_with_entities_async",
         return_value=typologies,
     )
     mocker.patch(
-        "application.routers.entity.get_local_authorities",
+        "application.routers.entity.get_local_authorities_async",
         return_value=local_authorities,
     )
     mocker.patch(
-        "application.routers.entity.get_dataset_names",
+        "application.routers.entity.get_dataset_names_async",
         return_value=["ancient-woodland"],
     )
     mocker.patch(
-        "application.routers.entity.get_typology_names", return_value=["geography"]
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
     )
     mocker.patch(
-        "application.routers.entity.get_organisations", return_value=organisation_list
+        "application.routers.entity.get_organisations_async",
+        return_value=organisation_list,
     )
 
     request = MagicMock()
-    result = search_entities(
-        request=request,
-        query_filters=QueryFilters(),
-        extension=None,
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=None,
+        )
     )
     try:
         result.template.render(result.context)
@@ -637,26 +829,31 @@ def test_search_entities_no_entities_returned_no_query_params_html(
 def test_search_entities_no_entities_returned_no_query_params_json(mocker):
     normalised_query_params = normalised_params(asdict(QueryFilters()))
     mocker.patch(
-        "application.routers.entity.get_entity_search",
+        "application.routers.entity.get_entity_search_async",
         return_value={"params": normalised_query_params, "count": 0, "entities": []},
     )
     mocker.patch(
-        "application.routers.entity.get_dataset_names",
+        "application.routers.entity.get_dataset_names_async",
         return_value=["ancient-woodland"],
     )
     mocker.patch(
-        "application.routers.entity.get_typology_names", return_value=["geography"]
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
     )
 
     request = MagicMock()
     request.query_params.get.return_value = None
     extension = MagicMock()
     extension.value = "json"
-    result = search_entities(
-        request=request,
-        query_filters=QueryFilters(),
-        extension=extension,
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=extension,
+        )
     )
+    # encoded in the threadpool rather than by the route
+    result = json.loads(result.body)
     assert isinstance(
         result, dict
     ), f"{type(result)} is expected to be a python dictionary"
@@ -667,25 +864,30 @@ def test_search_entities_no_entities_returned_no_query_params_json(mocker):
 def test_search_entities_no_entities_returned_no_query_params_geojson(mocker):
     normalised_query_params = normalised_params(asdict(QueryFilters()))
     mocker.patch(
-        "application.routers.entity.get_entity_search",
+        "application.routers.entity.get_entity_search_async",
         return_value={"params": normalised_query_params, "count": 0, "entities": []},
     )
     mocker.patch(
-        "application.routers.entity.get_dataset_names",
+        "application.routers.entity.get_dataset_names_async",
         return_value=["ancient-woodland"],
     )
     mocker.patch(
-        "application.routers.entity.get_typology_names", return_value=["geography"]
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
     )
     request = MagicMock()
     request.query_params.get.return_value = None
     extension = MagicMock()
     extension.value = "geojson"
-    result = search_entities(
-        request=request,
-        query_filters=QueryFilters(),
-        extension=extension,
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=extension,
+        )
     )
+    # encoded in the threadpool rather than by the route
+    result = json.loads(result.body)
     assert isinstance(
         result, dict
     ), f"{type(result)} is expected to be a python dictionary"
@@ -705,7 +907,7 @@ def test_search_entities_multiple_entities_returned_no_query_params_html(
 ):
     normalised_query_params = normalised_params(asdict(QueryFilters()))
     mocker.patch(
-        "application.routers.entity.get_entity_search",
+        "application.routers.entity.get_entity_search_async",
         return_value={
             "params": normalised_query_params,
             "count": 2,
@@ -713,32 +915,37 @@ def test_search_entities_multiple_entities_returned_no_query_params_html(
         },
     )
     mocker.patch(
-        "application.routers.entity.get_datasets", return_value=multiple_dataset_models
+        "application.routers.entity.get_datasets_async",
+        return_value=multiple_dataset_models,
     )
     mocker.patch(
-        "application.routers.entity.get_typologies_with_entities",
+        "application.routers.entity.get_typologies_with_entities_async",
         return_value=typologies,
     )
     mocker.patch(
-        "application.routers.entity.get_local_authorities",
+        "application.routers.entity.get_local_authorities_async",
         return_value=local_authorities,
     )
     mocker.patch(
-        "application.routers.entity.get_organisations", return_value=organisation_list
+        "application.routers.entity.get_organisations_async",
+        return_value=organisation_list,
     )
     mocker.patch(
-        "application.routers.entity.get_dataset_names",
+        "application.routers.entity.get_dataset_names_async",
         return_value=["ancient-woodland"],
     )
     mocker.patch(
-        "application.routers.entity.get_typology_names", return_value=["geography"]
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
     )
 
     request = MagicMock()
-    result = search_entities(
-        request=request,
-        query_filters=QueryFilters(),
-        extension=None,
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=None,
+        )
     )
     try:
         result.template.render(result.context)
@@ -756,7 +963,7 @@ def test_search_entities_multiple_entities_returned_no_query_params_json(
 ):
     normalised_query_params = normalised_params(asdict(QueryFilters()))
     mocker.patch(
-        "application.routers.entity.get_entity_search",
+        "application.routers.entity.get_entity_search_async",
         return_value={
             "params": normalised_query_params,
             "count": 0,
@@ -764,21 +971,26 @@ def test_search_entities_multiple_entities_returned_no_query_params_json(
         },
     )
     mocker.patch(
-        "application.routers.entity.get_dataset_names",
+        "application.routers.entity.get_dataset_names_async",
         return_value=["ancient-woodland"],
     )
     mocker.patch(
-        "application.routers.entity.get_typology_names", return_value=["geography"]
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
     )
     request = MagicMock()
     request.query_params.get.return_value = None
     extension = MagicMock()
     extension.value = "json"
-    result = search_entities(
-        request=request,
-        query_filters=QueryFilters(),
-        extension=extension,
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=extension,
+        )
     )
+    # encoded in the threadpool rather than by the route
+    result = json.loads(result.body)
     assert isinstance(
         result, dict
     ), f"{type(result)} is expected to be a python dictionary"
@@ -791,7 +1003,7 @@ def test_search_entities_multiple_entities_returned_no_query_params_geojson(
 ):
     normalised_query_params = normalised_params(asdict(QueryFilters()))
     mocker.patch(
-        "application.routers.entity.get_entity_search",
+        "application.routers.entity.get_entity_search_async",
         return_value={
             "params": normalised_query_params,
             "count": 0,
@@ -799,21 +1011,26 @@ def test_search_entities_multiple_entities_returned_no_query_params_geojson(
         },
     )
     mocker.patch(
-        "application.routers.entity.get_dataset_names",
+        "application.routers.entity.get_dataset_names_async",
         return_value=["ancient-woodland"],
     )
     mocker.patch(
-        "application.routers.entity.get_typology_names", return_value=["geography"]
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
     )
     request = MagicMock()
     request.query_params.get.return_value = None
     extension = MagicMock()
     extension.value = "geojson"
-    result = search_entities(
-        request=request,
-        query_filters=QueryFilters(),
-        extension=extension,
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=extension,
+        )
     )
+    # encoded in the threadpool rather than by the route
+    result = json.loads(result.body)
     assert isinstance(
         result, dict
     ), f"{type(result)} is expected to be a python dictionary"
@@ -833,7 +1050,7 @@ def test_search_entities_with_query_extension(
 
     normalised_query_params = normalised_params(asdict(QueryFilters()))
     mocker.patch(
-        "application.routers.entity.get_entity_search",
+        "application.routers.entity.get_entity_search_async",
         return_value={
             "params": normalised_query_params,
             "count": 0,
@@ -841,22 +1058,30 @@ def test_search_entities_with_query_extension(
         },
     )
     mocker.patch(
-        "application.routers.entity.get_dataset_names",
+        "application.routers.entity.get_dataset_names_async",
         return_value=["dataset1"],
     )
     mocker.patch(
-        "application.routers.entity.get_typology_names",
+        "application.routers.entity.get_typology_names_async",
         return_value=["typology1"],
     )
+    # without a data version reference data is read with the session
+    mocker.patch(
+        "application.data_access.digital_land_queries.get_data_version",
+        return_value=DataVersionModel(),
+    )
     mock_get_session = mocker.patch(
-        "application.routers.entity.get_session", return_value=MagicMock()
+        "application.routers.entity.get_async_session",
+        return_value=AsyncSessionStub(),
     )
 
-    result = search_entities(
-        request=request,
-        query_filters=QueryFilters(),
-        extension=extension,
-        session=mock_get_session.return_value,
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=extension,
+            session=mock_get_session.return_value,
+        )
     )
     try:
         result.template.render(result.context)
@@ -870,12 +1095,20 @@ def test_search_entities_with_query_extension(
 
 
 def test_get_entity_with_linked_local_plans(
-    mocker, local_plan_dataset_model, local_plan_boundary_dataset, linked_entity_model
+    mocker,
+    organisation_row,
+    local_plan_dataset_model,
+    local_plan_boundary_dataset,
+    linked_entity_model,
 ):
     mocker.patch(
-        "application.routers.entity.get_entity_query",
+        "application.routers.entity.get_entity_query_async",
         return_value=(local_plan_dataset_model, None, None),
     )
+    mocker.patch(
+        "application.routers.entity.get_entity_row",
+        return_value=(organisation_row, None, None),
+    )
     mocker.patch(
         "application.routers.entity.get_datasets",
         return_value=[local_plan_boundary_dataset],
@@ -885,12 +1118,19 @@ def test_get_entity_with_linked_local_plans(
         return_value=local_plan_boundary_dataset,
     )
     mocker.patch(
-        "application.routers.entity.fetch_linked_local_plans",
+        "application.routers.entity.make_linked_local_plans",
         return_value=linked_entity_model,
     )
 
     request = MagicMock()
-    result = get_entity(request=request, entity="4219999", extension=None)
+    result = asyncio.run(
+        get_entity(
+            request=request,
+            entity="4219999",
+            extension=None,
+            session=AsyncSessionStub(),
+        )
+    )
 
     assert (
         result.status_code == 200
@@ -904,3 +1144,263 @@ def test_get_entity_with_linked_local_plans(
         else:
             logging.warning("result has no context")
         assert False, "template unable to render, missing variable(s) from context"
+
+
+def test_search_entities_capped_count_returned_as_lower_bound_json(
+    mocker, multiple_entity_models
+):
+    normalised_query_params = normalised_params(asdict(QueryFilters()))
+    mocker.patch(
+        "application.routers.entity.get_entity_search_async",
+        return_value={
+            "params": normalised_query_params,
+            "count": 10000,
+            "count_type": CountOption.capped,
+            "entities": multiple_entity_models,
+        },
+    )
+    mocker.patch(
+        "application.routers.entity.get_dataset_names_async",
+        return_value=["ancient-woodland"],
+    )
+    mocker.patch(
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
+    )
+    request = MagicMock()
+    request.query_params.get.return_value = None
+    extension = MagicMock()
+    extension.value = "json"
+    result = asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=extension,
+        )
+    )
+    # encoded in the threadpool rather than by the route
+    result = json.loads(result.body)
+    assert result["count"] == "10000+"
+
+
+def test_search_entities_json_encoded_off_the_event_loop(
+    mocker, multiple_entity_models
+):
+    mocker.patch(
+        "application.routers.entity.get_entity_search_async",
+        return_value={
+            "params": normalised_params(asdict(QueryFilters())),
+            "count": 2,
+            "entities": multiple_entity_models,
+        },
+    )
+    mocker.patch(
+        "application.routers.entity.get_dataset_names_async",
+        return_value=["ancient-woodland"],
+    )
+    mocker.patch(
+        "application.routers.entity.get_typology_names_async",
+        return_value=["geography"],
+    )
+    threads = []
+
+    def encode_json(content):
+        threads.append(threading.get_ident())
+        return b"{}"
+
+    mocker.patch("application.core.utils.encode_json", side_effect=encode_json)
+    request = MagicMock()
+    request.query_params.get.return_value = None
+    extension = MagicMock()
+    extension.value = "json"
+
+    asyncio.run(
+        search_entities(
+            request=request,
+            query_filters=QueryFilters(),
+            extension=extension,
+        )
+    )
+
+    assert threads and threading.get_ident() not in threads
+
+
+def test_get_entity_page_rendered_off_the_event_loop(
+    mocker,
+    organisation_row,
+    single_entity_model,
+    multiple_dataset_models,
+    ancient_woodland_dataset,
+):
+    mocker.patch(
+        "application.routers.entity.get_entity_query_async",
+        return_value=(single_entity_model, None, None),
+    )
+    mocker.patch(
+        "application.routers.entity.get_entity_row",
+        return_value=(organisation_row, None, None),
+    )
+    mocker.patch(
+        "application.routers.entity.get_datasets", return_value=multiple_dataset_models
+    )
+    mocker.patch(
+        "application.routers.entity.get_dataset_query",
+        return_value=ancient_woodland_dataset,
+    )
+    threads = []
+    mocker.patch(
+        "application.routers.entity.templates.TemplateResponse",
+        side_effect=lambda *args, **kwargs: threads.append(threading.get_ident()),
+    )
+
+    asyncio.run(
+        get_entity(
+            request=MagicMock(),
+            entity="11000000",
+            extension=None,
+            session=AsyncSessionStub(),
+        )
+    )
+
+    assert threads and threading.get_ident() not in threads
+
+
+def test_get_entity_page_fetched_by_run_sync_and_made_off_the_event_loop(
+    mocker,
+    entity_response_cache,
+    organisation_row,
+    multiple_dataset_models,
+    ancient_woodland_dataset,
+):
+    threads = {"fetch": [], "model": []}
+
+    def get_entity_row(session, id, *args, **kwargs):
+        threads["fetch"].append(threading.get_ident())
+        # organisation entities are held as strings
+        if int(id) == 600001:
+            return organisation_row, None, None
+        return (
+            EntityOrm(
+                entity=id,
+                dataset="ancient-woodland",
+                reference="1481207",
+                organisation_entity=600001,
+            ),
+            None,
+            None,
+        )
+
+    def make_model(entity_orm):
+        threads["model"].append(threading.get_ident())
+        return entity_factory(entity_orm)
+
+    for module in ("routers.entity", "data_access.entity_queries"):
+        mocker.patch(f"application.{module}.get_entity_row", side_effect=get_entity_row)
+        mocker.patch(f"application.{module}.entity_factory", side_effect=make_model)
+    mocker.patch(
+        "application.routers.entity.get_datasets", return_value=multiple_dataset_models
+    )
+    mocker.patch(
+        "application.routers.entity.get_dataset_query",
+        return_value=ancient_woodland_dataset,
+    )
+
+    result = asyncio.run(
+        get_entity(
+            request=MagicMock(),
+            entity=11000000,
+            extension=None,
+            session=AsyncSession(),
+        )
+    )
+
+    assert result.status_code == 200
+    assert result.context["organisation_entity"].name == "Test organisation"
+    # the queries run through the session on the event loop and the models
+    # are made in the threadpool
+    assert threads["fetch"] == [threading.get_ident()] * 2
+    assert len(threads["model"]) == 2
+    assert threading.get_ident() not in threads["model"]
+
+
+def test_stream_ndjson_writes_an_entity_per_line(multiple_entity_models):
+    lines = list(_stream_ndjson(iter(multiple_entity_models), exclude={"prefix"}))
+
+    assert len(lines) == 2
+    for line in lines:
+        assert line.endswith(b"\n")
+        entity = json.loads(line)
+        assert entity["entity"] == 11000000
+        assert entity["entry-date"] == "2022-03-23"
+        assert "geojson" not in entity
+        assert "prefix" not in entity
+
+
+def test_stream_geojson_seq_writes_record_separated_features(
+    multiple_entity_models,
+):
+    records = list(_stream_geojson_seq(iter(multiple_entity_models)))
+
+    assert len(records) == 2
+    for record in records:
+        assert record.startswith(b"\x1e") and record.endswith(b"\n")
+        feature = json.loads(record[1:])
+        assert feature["type"] == "Feature"
+        assert feature["geometry"]["type"] == "MultiPolygon"
+        assert "geometry" not in feature["properties"]
+
+
+def test_export_entities_streams_ndjson(mocker, multiple_entity_models):
+    get_entity_export = mocker.patch(
+        "application.routers.entity.get_entity_export",
+        return_value=iter(multiple_entity_models),
+    )
+    mocker.patch(
+        "application.routers.entity.get_dataset_names",
+        return_value=["ancient-woodland"],
+    )
+    mocker.patch(
+        "application.routers.entity.get_typology_names", return_value=["geography"]
+    )
+    request = MagicMock()
+    request.url.path = "/entity.ndjson"
+
+    result = export_entities(request=request, query_filters=QueryFilters())
+
+    assert isinstance(result, StreamingResponse)
+    assert result.media_type == "application/x-ndjson"
+    get_entity_export.assert_called_once()
+
+
+def test_get_csv_fields_entity_columns_then_json_fields():
+    fields = _get_csv_fields(["listed_building_grade", "notes"], exclude={"point"})
+
+    assert fields[:3] == ["entity", "reference", "prefix"]
+    assert fields[-2:] == ["listed-building-grade", "notes"]
+    assert "geojson" not in fields
+    assert "point" not in fields
+
+
+def test_stream_csv_flattens_json_fields():
+    from application.core.models import entity_factory
+    from application.db.models import EntityOrm
+
+    entity = entity_factory(
+        EntityOrm(
+            entity=1,
+            name="test",
+            dataset="listed-building",
+            json={"listed-building-grade": "II", "documents": ["a", "b"]},
+        )
+    )
+    fields = _get_csv_fields(["documents", "listed-building-grade"])
+
+    rows = list(
+        csv.DictReader(io.StringIO("".join(_stream_csv(iter([entity]), fields))))
+    )
+
+    assert len(rows) == 1
+    assert rows[0]["entity"] == "1"
+    assert rows[0]["listed-building-grade"] == "II"
+    assert rows[0]["documents"] == '["a", "b"]'
+    assert rows[0]["geometry"] == ""
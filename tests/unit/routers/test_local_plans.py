@@ -2,12 +2,12 @@ import pytest
 
 from unittest.mock import MagicMock
 from application.routers.entity import fetch_linked_local_plans
-from application.core.models import EntityModel
+from application.db.models import EntityOrm
 
 
 @pytest.fixture
-def local_plan_model():
-    model = EntityModel(
+def local_plan_row():
+    model = EntityOrm(
         entity=4220006,
         entry_date="2022-03-23",
         name="test-local-plan",
@@ -24,8 +24,8 @@ def local_plan_model():
 
 
 @pytest.fixture
-def local_plan_boundary_model():
-    model = EntityModel(
+def local_plan_boundary_row():
+    model = EntityOrm(
         entity=4220006,
         entry_date="2022-03-23",
         name="test Local Plan boundary",
@@ -36,29 +36,13 @@ def local_plan_boundary_model():
             "adopted-date": "2018-09-27",
             "documentation-url": "https://www.scambs.gov.uk/planning/south-cambridgeshire-local-plan-2018",
         },
-        geojson={
-            "type": "Feature",
-            "geometry": {
-                "type": "MultiPolygon",
-                "coordinates": [
-                    [
-                        [
-                            [0.145139, 50.986737],
-                            [0.145088, 50.986778],
-                            [0.14473, 50.986668],
-                            [0.145139, 50.986737],
-                        ]
-                    ]
-                ],
-            },
-        },
     )
-    return model, None
+    return model
 
 
 @pytest.fixture
-def local_plan_timetable_model():
-    model1 = EntityModel(
+def local_plan_timetable_rows():
+    model1 = EntityOrm(
         entity=4220005,
         entry_date="2022-03-23",
         name="test Local Plan timetable",
@@ -68,7 +52,7 @@ def local_plan_timetable_model():
         json={"event-date": "2018-11-20", "local-plan": "1481207"},
     )
 
-    model2 = EntityModel(
+    model2 = EntityOrm(
         entity=4220006,
         entry_date="2022-03-23",
         name="test Local Plan timetable",
@@ -82,8 +66,8 @@ def local_plan_timetable_model():
 
 
 @pytest.fixture
-def local_plan_document_model():
-    model1 = EntityModel(
+def local_plan_document_rows():
+    model1 = EntityOrm(
         entity=4220007,
         entry_date="2022-03-23",
         name="test Local Plan Document",
@@ -101,9 +85,9 @@ def local_plan_document_model():
 
 def test_fetch_linked_local_plans_json_returned(
     mocker,
-    local_plan_timetable_model,
-    local_plan_document_model,
-    local_plan_boundary_model,
+    local_plan_timetable_rows,
+    local_plan_document_rows,
+    local_plan_boundary_row,
 ):
     mock_session = MagicMock()
     mocker.patch(
@@ -113,15 +97,19 @@ def test_fetch_linked_local_plans_json_returned(
         },
     )
 
+    get_linked_entity_rows_by_dataset = mocker.patch(
+        "application.routers.entity.get_linked_entity_rows_by_dataset",
+        side_effect=lambda session, datasets, reference, linked_dataset=None: {
+            dataset: {
+                "local-plan-timetable": local_plan_timetable_rows,
+                "local-plan-document": local_plan_document_rows,
+                "local-plan-boundary": local_plan_boundary_row,
+            }[dataset]
+            for dataset in datasets
+        },  # Return the appropriate model for each dataset
+    )
     mocker.patch(
-        "application.routers.entity.get_linked_entities",
-        side_effect=lambda session, dataset, reference, linked_dataset=None: {
-            "local-plan-timetable": local_plan_timetable_model,
-            "local-plan-document": local_plan_document_model,
-            "local-plan-boundary": local_plan_boundary_model,
-        }[
-            dataset
-        ],  # Return the appropriate model for the dataset
+        "application.routers.entity.get_entity_rows_by_reference", return_value={}
     )
 
     e_dict_sorted = {}
@@ -140,3 +128,51 @@ def test_fetch_linked_local_plans_json_returned(
     assert (
         len(results["local-plan-document"]) == 1
     ), "Expected 1 entity in 'local-plan-document'"
+    assert get_linked_entity_rows_by_dataset.call_count == 1
+
+
+def test_fetch_linked_local_plans_resolves_events_and_boundary_together(
+    mocker, local_plan_timetable_rows, local_plan_boundary_row
+):
+    local_plan_timetable_rows[0].json["local-plan-event"] = "plan-published"
+    local_plan_timetable_rows[1].json["local-plan-event"] = "estimated-plan-published"
+    boundary = local_plan_boundary_row
+    event = EntityOrm(
+        entity=2950000,
+        reference="plan-published",
+        name="Plan published",
+        dataset="local-plan-event",
+    )
+    mocker.patch(
+        "application.routers.entity.get_linked_entity_rows_by_dataset",
+        return_value={
+            "local-plan-document": [],
+            "local-plan-timetable": local_plan_timetable_rows,
+            "local-plan-boundary": [],
+        },
+    )
+    get_entity_rows_by_reference = mocker.patch(
+        "application.routers.entity.get_entity_rows_by_reference",
+        return_value={
+            ("local-plan-event", "plan-published"): event,
+            ("local-plan-boundary", "E07000012"): boundary,
+        },
+    )
+
+    results, found_boundary = fetch_linked_local_plans(
+        MagicMock(),
+        {
+            "dataset": "local-plan",
+            "reference": "1481207",
+            "local-plan-boundary": "E07000012",
+        },
+    )
+
+    get_entity_rows_by_reference.assert_called_once()
+    assert get_entity_rows_by_reference.call_args.args[1] == [
+        ("local-plan-event", "plan-published"),
+        ("local-plan-boundary", "E07000012"),
+    ]
+    assert found_boundary.reference == boundary.reference
+    assert results["local-plan-timetable"][0].local_plan_event.entity == event.entity
+    assert results["local-plan-timetable"][1].local_plan_event is None
@@ -1,3 +1,4 @@
+import pytest
 from pydantic.error_wrappers import ValidationError
 
 from application.search.filters import (
@@ -119,3 +120,21 @@ def test_FactPathParams_hash_sha256_regex_validator_invalid_hash_supplied():
         assert False, f" invalid hash :{fact} has been labelled as valid"
     except ValidationError:
         assert True
+
+
+def test_QueryFilters_readable_geometry_validated_without_database(mocker):
+    get_context_session = mocker.patch("application.search.filters.get_context_session")
+    geometry = ["POINT(-0.33737 53.74541)", "POLYGON((0 0,1 0,1 1,0 0))"]
+
+    assert QueryFilters(geometry=geometry).geometry == geometry
+    get_context_session.assert_not_called()
+
+
+def test_QueryFilters_unreadable_geometry_checked_by_database(mocker):
+    get_context_session = mocker.patch("application.search.filters.get_context_session")
+    session = get_context_session.return_value.__enter__.return_value
+    session.execute.side_effect = Exception("parse error")
+
+    with pytest.raises(ValidationError):
+        QueryFilters(geometry=["POINT(-0.33737 53.74541)", "POINT(1 2"])
+    assert session.execute.call_count == 1
@@ -6,6 +6,7 @@ from application.search.validators import (
     validate_month_integer,
     validate_year_integer,
     validate_curies,
+    is_readable_wkt,
 )
 
 from application.exceptions import DigitalLandValidationError, DatasetValueNotFound
@@ -156,3 +157,42 @@ def test_validate_curies_rejects_all_if_any_invalid():
     ]
     with pytest.raises(DigitalLandValidationError):
         validate_curies(curies)
+
+
+readable_wkt = [
+    "POINT(-0.33737 53.74541)",
+    "point(-0.33737 53.74541)",
+    " POINT (-0.33737 53.74541) ",
+    "POINT EMPTY",
+    "POLYGON((0 0,1 0,1 1,0 0))",
+    "MULTIPOLYGON(((0 0,1 0,1 1,0 0)),((2 2,3 2,3 3,2 2)))",
+    "GEOMETRYCOLLECTION(POINT(1 2),LINESTRING(0 0,1 1))",
+    # postgis reads self intersecting polygons, st_isvalid is only false
+    "POLYGON((0 0,1 1,1 0,0 1,0 0))",
+]
+
+
+@pytest.mark.parametrize("geometry", readable_wkt)
+def test_is_readable_wkt(geometry):
+    assert is_readable_wkt(geometry)
+
+
+unreadable_wkt = [
+    "",
+    "nonsense",
+    "POINT(1 2",
+    "POINT(1 2) junk",
+    "POINT(1 2))",
+    "POINT(1 2)(3 4)",
+    "POINT(nan nan)",
+    "POINT(inf 1)",
+    "POLYGON((0 0,1 0,1 1))",
+    "LINEARRING(0 0,1 1,1 0,0 0)",
+    "CIRCULARSTRING(0 0,1 1,2 0)",
+    "SRID=4326;POINT(1 2)",
+]
+
+
+@pytest.mark.parametrize("geometry", unreadable_wkt)
+def test_is_readable_wkt_left_to_database(geometry):
+    assert not is_readable_wkt(geometry)
@@ -1,4 +1,6 @@
+from application.core.models import EntityModel
 from application.core.utils import make_links
+from application.search.enum import CountOption
 
 scheme = "http"
 netloc = "localhost"
@@ -44,6 +46,44 @@ def test_pagination_links_should_have_all_links_except_previous_on_first_page():
     assert links.get("prev") is None
 
 
+def test_cursor_pagination_links_on_first_page_start_after_last_entity():
+    data = {
+        "count": 11,
+        "params": {"limit": 10},
+        "entities": [EntityModel(entity=entity) for entity in range(1, 11)],
+    }
+    params = "limit=10"
+    links = make_links(scheme, netloc, path, params, data, cursor=True)
+
+    assert links["first"] == "http://localhost/entity.json?limit=10"
+    assert links["next"] == "http://localhost/entity.json?limit=10&after=10"
+    assert links.get("last") is None
+    assert links.get("prev") is None
+
+
+def test_cursor_pagination_links_not_used_for_offset():
+    data = {
+        "count": 45,
+        "params": {"limit": 10, "offset": 10},
+        "entities": [EntityModel(entity=entity) for entity in range(11, 21)],
+    }
+    links = make_links(scheme, netloc, path, "limit=10&offset=10", data, cursor=True)
+
+    assert links["prev"] == "http://localhost/entity.json?limit=10"
+    assert links["next"] == "http://localhost/entity.json?limit=10&offset=20"
+
+
+def test_pagination_links_on_first_page_only_page_of_estimate():
+    data = {
+        "count": 100,
+        "count_type": CountOption.estimate,
+        "params": {"limit": 10},
+        "entities": [EntityModel(entity=1)],
+    }
+    links = make_links(scheme, netloc, path, "", data, cursor=True)
+    assert links == {}
+
+
 def test_pagination_links_should_have_previous_link_if_not_on_last_page():
     data = {"count": 45, "params": {"limit": 10, "offset": 10}}
     params = {}
@@ -89,3 +129,92 @@ def test_pagination_if_limit_zero_then_no_links():
     params = {}
     links = make_links(scheme, netloc, path, params, data)
     assert links == {}
+
+
+def test_cursor_pagination_links_use_last_entity_on_page():
+    data = {
+        "count": 45,
+        "params": {"limit": 2, "after": 10},
+        "entities": [EntityModel(entity=11), EntityModel(entity=15)],
+    }
+    params = "limit=2&after=10"
+    links = make_links(scheme, netloc, path, params, data)
+    assert links["first"] == "http://localhost/entity.json?limit=2"
+    assert links["next"] == "http://localhost/entity.json?limit=2&after=15"
+    assert links.get("prev") is None
+    assert links.get("last") is None
+
+
+def test_cursor_pagination_no_next_link_on_partial_page():
+    data = {
+        "count": 45,
+        "params": {"limit": 2, "after": 10},
+        "entities": [EntityModel(entity=11)],
+    }
+    params = "limit=2&after=10"
+    links = make_links(scheme, netloc, path, params, data)
+    assert links["first"] == "http://localhost/entity.json?limit=2"
+    assert links.get("next") is None
+
+
+def test_cursor_pagination_replaces_offset_in_links():
+    data = {
+        "count": 45,
+        "params": {"limit": 1, "after": 0, "offset": 20},
+        "entities": [EntityModel(entity=1)],
+    }
+    params = "offset=20&after=0"
+    links = make_links(scheme, netloc, path, params, data)
+    assert links["next"] == "http://localhost/entity.json?after=1&limit=1"
+
+
+def test_uncounted_pagination_links_have_no_last_link():
+    data = {
+        "count": 100,
+        "count_type": CountOption.estimate,
+        "params": {"limit": 1, "offset": 10},
+        "entities": [EntityModel(entity=11)],
+    }
+    params = {}
+    links = make_links(scheme, netloc, path, params, data)
+    assert links["first"] == "http://localhost/entity.json?limit=1"
+    assert links["next"] == "http://localhost/entity.json?limit=1&offset=11"
+    assert links["prev"] == "http://localhost/entity.json?limit=1&offset=9"
+    assert links.get("last") is None
+
+
+def test_uncounted_pagination_links_no_next_link_on_partial_page():
+    data = {
+        "count": None,
+        "count_type": CountOption.none,
+        "params": {"limit": 10, "offset": 10},
+        "entities": [EntityModel(entity=11)],
+    }
+    params = {}
+    links = make_links(scheme, netloc, path, params, data)
+    assert links.get("next") is None
+    assert links["prev"] == "http://localhost/entity.json?limit=10"
+
+
+def test_uncounted_pagination_links_should_be_empty_for_single_page():
+    data = {
+        "count": None,
+        "count_type": CountOption.none,
+        "params": {"limit": 10},
+        "entities": [EntityModel(entity=11)],
+    }
+    params = {}
+    links = make_links(scheme, netloc, path, params, data)
+    assert links == {}
+
+
+def test_cursor_pagination_links_without_count():
+    data = {
+        "count": 10000,
+        "count_type": CountOption.capped,
+        "params": {"limit": 1, "after": 10},
+        "entities": [EntityModel(entity=11)],
+    }
+    params = "limit=1&after=10"
+    links = make_links(scheme, netloc, path, params, data)
+    assert links["next"] == "http://localhost/entity.json?limit=1&after=11"
@@ -77,3 +77,32 @@ def test_get_operator(expected, params):
     from application.data_access.entity_query_helpers import get_operator
 
     assert expected == get_operator(params)
+
+
+def test_make_cache_key_same_for_equivalent_params():
+    from application.data_access.entity_query_helpers import (
+        make_cache_key,
+        normalised_params,
+    )
+
+    key_1 = make_cache_key(normalised_params({"dataset": ["b", "a"], "limit": 10}))
+    key_2 = make_cache_key(
+        normalised_params({"limit": 10, "dataset": ["a", "b", "a"], "offset": None})
+    )
+    assert key_1 == key_2
+    assert hash(key_1) == hash(key_2)
+
+
+def test_make_cache_key_ignores_accept():
+    from application.data_access.entity_query_helpers import make_cache_key
+
+    assert make_cache_key({"dataset": ["a"], "accept": "text/html"}) == make_cache_key(
+        {"dataset": ["a"]}
+    )
+
+
+def test_normalised_params_keeps_zero_precision():
+    from application.data_access.entity_query_helpers import normalised_params
+
+    params = normalised_params({"precision": 0, "offset": 0, "simplify": None})
+    assert params == {"precision": 0}